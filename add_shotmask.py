@@ -1,79 +1,11 @@
 # run in a folder with .mp4 files like this: python W:\04_PersonalProjects\Chris\00_Miniprojects\editbot\add_shotmask.py -i . -o ./output -p Animation -fps 30 
 
 from editbot_main import *
-import os, copy, argparse
+import os, json, threading, argparse
 
 ffmpeg_bin=r"C:\Program Files\ffmpeg\bin\ffmpeg.exe"
 ffprobe_bin=r"C:\Program Files\ffmpeg\bin\ffprobe.exe"
 
-def build_edit(
-    name, 
-    folder,
-    pass_name,
-    video_filename,
-    edit_output_path, 
-    edit_output_name,
-    logo_path,
-    fps,
-    studio_name = None,
-    director_name =None,
-    subfolders = False,
-    ):
-
-    base_config = Config(
-        ffmpeg_bin=ffmpeg_bin,
-        ffprobe_bin=ffprobe_bin,
-        studio_name = studio_name,
-        director_name =director_name,
-        name=name,
-        default_pass_name=pass_name,
-        enable_shotmask=True,
-        shot_mask_logo_path=logo_path,
-        clip_frame_handles=0,
-        fps=fps
-    )
-
-    # build location
-    storageLocation = Location(name='root', folder=folder)
-    storageLocation.addSublocation(Location(name=pass_name, folder=folder, priority=7, subfolders_only=subfolders))
-
-    anim_config = copy.deepcopy(base_config)
-    anim_config.force_pass = True,
-    # anim_config.default_pass_name = 'Style_Test'
-    animEdit = Edit(
-        config=anim_config,
-        source_folder=storageLocation,
-        # frameoffset = 30*5, # 5 seconds slate
-        )
-
-    #custom edit
-    footage_clip = Clip(
-        config=anim_config,
-        name = os.path.splitext(os.path.basename(video_filename))[0],
-        # frame_handles_in=5,
-        in_frame = 0,
-        duration= 0,
-        # pass_name='Layout'
-    )
-    footage_clip.findFootage(storageLocation)
-    footage_clip.getFrameRate()
-    footage_clip.getDuration()
-
-    animEdit.addClip(footage_clip)
-    
-    edits = [animEdit]
-
-    for edit in edits:
-        edit.conformEdit(mode='in_frame')
-        edit.preconvertClips()
-
-        print("Building edit:")
-        [print(f"    {editclip.name}") for editclip in edit.edit]
-
-        result_path = edit.build(os.path.join(edit_output_path, edit_output_name))
-        print(f"Edit saved to: {result_path}")
-        edit.cleanup()
-
 def list_video_files_in_folder(foldername, ext=".mp4"):
     video_files = []
     folder_list = os.listdir(foldername)
@@ -83,6 +15,81 @@ def list_video_files_in_folder(foldername, ext=".mp4"):
     
     return video_files
 
+# output name -> parameter hash of every rendered file, kept in the output folder
+manifest_name = "editbot_shotmask.json"
+
+def load_manifest(edit_output_path):
+    try:
+        with open(os.path.join(edit_output_path, manifest_name), "r") as manifest_file:
+            return json.load(manifest_file)
+    except (OSError, ValueError):
+        return {}
+
+def save_manifest(edit_output_path, manifest):
+    manifest_path = os.path.join(edit_output_path, manifest_name)
+    with open(manifest_path+".tmp", "w") as manifest_file:
+        json.dump(manifest, manifest_file, indent=4)
+    os.replace(manifest_path+".tmp", manifest_path)
+
+def shotmask_output_name(video_filename):
+    return f"{os.path.splitext(os.path.basename(video_filename))[0]}_shotmask.mp4"
+
+def make_clip(config, video_filename):
+    # the file is used directly, setting it probes it once through the shared probe cache
+    clip = Clip(
+        config=config,
+        name = os.path.splitext(os.path.basename(video_filename))[0],
+        in_frame = 0,
+        duration= 0,
+    )
+    clip.clip_path = Path(video_filename)
+    return clip
+
+def render_shotmask(config, clip, output_path):
+    edit = Edit(config=config)
+    edit.addClip(clip)
+    # a single clip always fits into one filter graph, so the mask and timecode are drawn in one pass
+    result_path = edit.renderGraph(output_path)
+    edit.cleanup()
+    return result_path
+
+def batch_shotmask(video_files, edit_output_path, config, jobs=1, force=False):
+    '''renders the shotmask onto all video_files with jobs files in parallel.
+    Files whose output is newer than the source and was rendered with the same parameters are skipped, unless force is set.
+    Returns the lists of rendered, skipped and failed files.'''
+    manifest = load_manifest(edit_output_path)
+    manifest_lock = threading.Lock()
+    profile = config.getEncodingProfile()
+
+    def process(videofile):
+        output_name = shotmask_output_name(videofile)
+        output_path = os.path.join(edit_output_path, output_name)
+        clip = make_clip(config, videofile)
+        if not clip.ready:
+            print(f"Cannot read {videofile}, skipping it")
+            return "failed"
+        # the date of the sequence mask is left out, so outputs don't get stale every day
+        parameters = hashCacheKey({
+            "clip": clip.cacheKey(out_fps=config.fps, encode_settings=profile.final),
+            "fps": config.fps,
+            "name": config.name
+        })
+        if not force and manifest.get(output_name)==parameters and os.path.isfile(output_path) and os.path.getmtime(output_path)>=os.path.getmtime(videofile):
+            return "skipped"
+        if not render_shotmask(config, clip, output_path):
+            return "failed"
+        with manifest_lock:
+            manifest[output_name] = parameters
+            save_manifest(edit_output_path, manifest)
+        return "rendered"
+
+    with ThreadPoolExecutor(max_workers=max(jobs, 1)) as pool:
+        states = list(pool.map(process, video_files))
+    results = {state: [f for f, s in zip(video_files, states) if s==state] for state in ("rendered", "skipped", "failed")}
+    print(f"Rendered {len(results['rendered'])}, skipped {len(results['skipped'])} up to date and {len(results['failed'])} failed files")
+    [print(f"    failed: {f}") for f in results["failed"]]
+    return results
+
 if __name__ == "__main__":
 
     parser = argparse.ArgumentParser(
@@ -95,34 +102,41 @@ if __name__ == "__main__":
     parser.add_argument("--studio_name", "-n:s", type=str, default="")
     parser.add_argument("--director_name", "-n:d", default="")
     parser.add_argument("--name", "-n", type=str, default="")
+    parser.add_argument("--jobs", "-j", type=int, default=1, help="number of files rendered in parallel")
+    parser.add_argument("--force", "-f", action="store_true", help="render all files again, even if they are up to date")
+    parser.add_argument("--chunk_length", "-c", type=float, default=0, help="split files longer than twice this many seconds into chunks rendered in parallel")
 
     args = parser.parse_args()
     folder = args.inputfolder
     edit_output_path= args.outputfolder
-    out_fps = args.frames_per_second
-    studio_name = args.studio_name
-    director_name = args.director_name
-    name = args.name
-    pass_name = args.pass_name
 
     if not os.path.exists(edit_output_path):
         print(f"Outputfolder did not exist, creating {os.path.abspath(edit_output_path)}")
         os.mkdir(os.path.abspath(edit_output_path))
 
-    for videofile in list_video_files_in_folder(folder):
-        edit_output_name=f"{os.path.splitext(os.path.basename(videofile))[0]}_shotmask.mp4"
-        # print(videofile)
-        # print(edit_output_name)
-        # print(edit_output_path)
-        build_edit( 
-            video_filename = videofile,
-            edit_output_path=edit_output_path, 
-            edit_output_name=edit_output_name,
-            studio_name=studio_name,
-            director_name=director_name,
-            name = name,
-            pass_name = pass_name,
-            folder = folder,
-            logo_path=os.path.join(os.path.dirname(__file__),"res","ta_logo_new.png"),
-            fps=out_fps
-            )
\ No newline at end of file
+    config = Config(
+        ffmpeg_bin=ffmpeg_bin,
+        ffprobe_bin=ffprobe_bin,
+        studio_name = args.studio_name,
+        director_name = args.director_name,
+        name=args.name,
+        default_pass_name=args.pass_name,
+        enable_shotmask=True,
+        shot_mask_logo_path=os.path.join(os.path.dirname(__file__),"res","ta_logo_new.png"),
+        clip_frame_handles=0,
+        fps=args.frames_per_second,
+        chunk_length=args.chunk_length,
+        # clips converted when the graph falls back to one clip at a time go into the temp folder,
+        # dailies would only push the edit intermediates out of the clip cache
+        clip_cache=False
+    )
+
+    # outputs written into the input folder are not masked again
+    video_files = [vf for vf in list_video_files_in_folder(folder) if not vf.endswith("_shotmask.mp4")]
+    batch_shotmask(
+        video_files,
+        edit_output_path,
+        config,
+        jobs=args.jobs,
+        force=args.force
+        )
@@ -17,6 +17,7 @@ def build_edit(
     studio_name = None,
     director_name =None,
     subfolders = False,
+    deadline = None,
     ):
 
     base_config = Config(
@@ -51,12 +52,19 @@ def build_edit(
     for edit in edits:
         edit.conformEdit(mode='duration')
         edit.addAutoSlate(duration=5)
-        edit.preconvertClips()
+        # with a deadline (a datetime) faster profiles or a smaller size are chosen so the build is done in time
+        profile = None
+        if deadline is not None:
+            plan = edit.plan(deadline=deadline)
+            print(plan.summary())
+            edit.applyPlan(plan)
+            profile = plan.profile
+        edit.preconvertClips(profile=profile)
 
         print("Building edit:")
         [print(f"    {editclip.name}") for editclip in edit.edit]
 
-        result_path = edit.build(os.path.join(edit_output_path, edit_output_name))
+        result_path = edit.build(os.path.join(edit_output_path, edit_output_name), profile=profile)
         print(f"Edit saved to: {result_path}")
         edit.cleanup()
 
@@ -0,0 +1,238 @@
+# run like this: python editbot_benchmark.py -s 10 100 -l 2 -r 640x360 -fps 24 30 --ffmpeg /usr/bin/ffmpeg --ffprobe /usr/bin/ffprobe
+
+from editbot_main import *
+import editbot_build_config_from_folder
+import os, sys, json, time, datetime, shutil, subprocess, platform, statistics, argparse
+
+ffmpeg_bin=r"C:\Program Files\ffmpeg\bin\ffmpeg.exe"
+ffprobe_bin=r"C:\Program Files\ffmpeg\bin\ffprobe.exe"
+
+STAGES = ['create_config_from_folder', 'findFootage', 'preconvertClips', 'preconvertClips_cached', 'build', 'fastbuild']
+
+def scenario_key(shots, length, size, fps_list):
+    return "{}shots_{}s_{}x{}_{}fps".format(shots, length, size[0], size[1], "-".join(str(fps) for fps in fps_list))
+
+def generate_master_clips(folder, length, size, fps_list):
+    # one testsrc clip per frame rate, the shots are copies of these
+    os.makedirs(folder, exist_ok=True)
+    masters = {}
+    for fps in fps_list:
+        master_path = os.path.join(folder, "master_{}s_{}x{}_{}fps.mp4".format(length, size[0], size[1], fps))
+        if not os.path.isfile(master_path):
+            job = FFmpegJob(
+                args=['-y', '-hide_banner', '-loglevel', 'error',
+                    '-f', 'lavfi', '-i', 'testsrc=size={}x{}:rate={}:duration={}'.format(size[0], size[1], fps, length),
+                    '-c:v', 'libx264', '-preset', 'ultrafast', '-g', str(fps), '-pix_fmt', 'yuv420p',
+                    master_path],
+                output_path=master_path,
+                name='master {}fps'.format(fps)
+            )
+            if not reportResult(runFFmpeg(ffmpeg_bin, job)):
+                raise RuntimeError("Could not generate synthetic footage with {}".format(ffmpeg_bin))
+        masters[fps] = master_path
+    return masters
+
+def generate_scenario(work_folder, shots, length, size, fps_list):
+    '''creates a shot folder with synthetic footage and an edit description in the minimal_edit.json format.
+    Shots cycle through fps_list for mixed frame rates. Existing footage is reused, so it is not part of the timings.'''
+    scenario_folder = os.path.join(work_folder, scenario_key(shots, length, size, fps_list))
+    footage_folder = os.path.join(scenario_folder, "footage")
+    os.makedirs(footage_folder, exist_ok=True)
+    masters = generate_master_clips(os.path.join(work_folder, "masters"), length, size, fps_list)
+
+    edit_desc = []
+    start_frame = 0
+    for i in range(shots):
+        name = "S{:04d}".format((i+1)*10)
+        fps = fps_list[i % len(fps_list)]
+        shot_path = os.path.join(footage_folder, name+".mp4")
+        if not os.path.isfile(shot_path):
+            shutil.copyfile(masters[fps], shot_path)
+        edit_desc.append({
+            "name": name,
+            "startFrame": start_frame,
+            "durationSeconds": length
+        })
+        start_frame += round(length*fps_list[0])
+
+    edit_desc_path = os.path.join(scenario_folder, "edit.json")
+    with open(edit_desc_path, "w") as edit_desc_file:
+        json.dump(edit_desc, edit_desc_file, indent=4)
+    return scenario_folder, footage_folder, edit_desc_path
+
+def timed(timings, stage, function, *args, **kwargs):
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    timings[stage] = time.perf_counter()-start
+    print("    {}: {:.2f}s".format(stage, timings[stage]))
+    return result
+
+def run_scenario(work_folder, shots, length, size, fps_list, jobs=0, profile='draft'):
+    '''times every stage once with empty caches, returns the timings in seconds and the stage report of the edit'''
+    scenario_folder, footage_folder, edit_desc_path = generate_scenario(work_folder, shots, length, size, fps_list)
+    run_folder = os.path.join(scenario_folder, "run")
+    if os.path.exists(run_folder):
+        shutil.rmtree(run_folder)
+    cache_folder = os.path.join(run_folder, "cache")
+    os.makedirs(cache_folder)
+
+    # the config script probes into the default cache, point it at the empty one of this run
+    editbot_build_config_from_folder.ffprobe_bin = ffprobe_bin
+    editbot_build_config_from_folder.cache_folder = cache_folder
+
+    config = Config(
+        ffmpeg_bin=ffmpeg_bin,
+        ffprobe_bin=ffprobe_bin,
+        shot_mask_logo_path=os.path.join(os.path.dirname(os.path.abspath(__file__)), "res", "ta_logo_new.png"),
+        clip_frame_handles=0,
+        clip_size=size,
+        fps=fps_list[0],
+        preconvert_jobs=jobs,
+        cache_folder=cache_folder,
+        encoding_profile=profile
+    )
+
+    timings = {}
+    timed(timings, 'create_config_from_folder', editbot_build_config_from_folder.create_config_from_folder, run_folder, "folder_edit.json", footage_folder)
+
+    edit = Edit(config=config, name=scenario_key(shots, length, size, fps_list))
+    edit.loadEdit(edit_desc_path)
+    timed(timings, 'findFootage', edit.findFootage, footage_folder)
+    timed(timings, 'preconvertClips', edit.preconvertClips, os.path.join(run_folder, "temp"))
+    timed(timings, 'preconvertClips_cached', edit.preconvertClips, os.path.join(run_folder, "temp"))
+    timed(timings, 'build', edit.build, os.path.join(run_folder, "build.mp4"))
+    timed(timings, 'fastbuild', edit.fastbuild, os.path.join(run_folder, "fastbuild.mp4"))
+
+    failed = [clip.name for clip in edit.failed_clips]
+    report = edit.timingReport()['stages']
+    edit.cleanup(check_folder_name=False)
+    shutil.rmtree(run_folder, ignore_errors=True)
+    return timings, report, failed
+
+def load_results(results_path):
+    results = []
+    if os.path.isfile(results_path):
+        with open(results_path, "r") as results_file:
+            for line in results_file:
+                try:
+                    results.append(json.loads(line))
+                except ValueError:
+                    continue
+    return results
+
+def find_regressions(result, previous_results, threshold=0.1, min_seconds=0.05):
+    '''compares result to the last run of the same scenario on the same host.
+    A stage is flagged if it got slower by more than threshold and more than min_seconds.'''
+    baseline = None
+    for previous in previous_results:
+        if previous["scenario"]==result["scenario"] and previous["host"]==result["host"]:
+            baseline = previous
+    if baseline is None:
+        return [], None
+
+    regressions = []
+    for stage, seconds in result["timings"].items():
+        base_seconds = baseline["timings"].get(stage)
+        if base_seconds is None:
+            continue
+        if seconds>base_seconds*(1+threshold) and seconds-base_seconds>min_seconds:
+            regressions.append({
+                "stage": stage,
+                "seconds": seconds,
+                "baseline_seconds": base_seconds,
+                "change": seconds/base_seconds-1 if base_seconds else 0
+            })
+    return regressions, baseline
+
+def get_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)), text=True, stderr=subprocess.DEVNULL).strip()
+    except (subprocess.CalledProcessError, OSError):
+        return ""
+
+def run_benchmarks(work_folder, results_path, shot_counts, length, size, fps_list, repeat=1, jobs=0, profile='draft', threshold=0.1):
+    '''runs every shot count repeat times and appends the median timings to results_path.
+    Returns all regressions against the previous run of each scenario.'''
+    previous_results = load_results(results_path)
+    all_regressions = []
+    for shots in shot_counts:
+        key = scenario_key(shots, length, size, fps_list)
+        runs = []
+        for i in range(repeat):
+            print("Benchmark {} ({}/{})".format(key, i+1, repeat))
+            runs.append(run_scenario(work_folder, shots, length, size, fps_list, jobs=jobs, profile=profile))
+
+        result = {
+            "scenario": key,
+            "time": datetime.datetime.now().isoformat(),
+            "revision": get_revision(),
+            "host": platform.node(),
+            "python": platform.python_version(),
+            "shots": shots,
+            "length": length,
+            "size": list(size),
+            "fps": fps_list,
+            "jobs": jobs,
+            "profile": profile,
+            "repeat": repeat,
+            "timings": {stage: statistics.median(timings[stage] for timings, report, failed in runs) for stage in STAGES},
+            "stages": runs[-1][1],
+            "failed_clips": runs[-1][2]
+        }
+
+        regressions, baseline = find_regressions(result, previous_results, threshold=threshold)
+        result["regressions"] = regressions
+        if baseline:
+            print("Compared to {} ({}):".format(baseline["time"], baseline.get("revision", "")))
+            for stage in STAGES:
+                print("    {:<24} {:>8.2f}s {:>8.2f}s".format(stage, result["timings"][stage], baseline["timings"].get(stage, 0)))
+        for regression in regressions:
+            print("REGRESSION {} {}: {:.2f}s -> {:.2f}s ({:+.0%})".format(key, regression["stage"], regression["baseline_seconds"], regression["seconds"], regression["change"]))
+        all_regressions.extend(regressions)
+
+        os.makedirs(os.path.dirname(os.path.abspath(results_path)), exist_ok=True)
+        with open(results_path, "a") as results_file:
+            results_file.write(json.dumps(result)+"\n")
+        previous_results.append(result)
+    return all_regressions
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(
+                    prog='Editbot Benchmark',
+                    description='Times config generation, footage search, conversion and builds on synthetic testsrc footage and flags regressions against earlier runs')
+    parser.add_argument("--workfolder", "-w", type=str, default=os.path.join(defaultCacheFolder(), "benchmark"))
+    parser.add_argument("--results", type=str, default="", help="json lines file with all runs, defaults to results.jsonl in the workfolder")
+    parser.add_argument("--shots", "-s", type=int, nargs="+", default=[10, 100])
+    parser.add_argument("--length", "-l", type=float, default=2, help="length of every shot in seconds")
+    parser.add_argument("--resolution", "-r", type=str, default="640x360")
+    parser.add_argument("--frames_per_second", "-fps", type=int, nargs="+", default=[24, 25, 30], help="shots cycle through these frame rates")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--jobs", "-j", type=int, default=0, help="clips converted in parallel, 0 uses all cpus")
+    parser.add_argument("--profile", type=str, default="draft")
+    parser.add_argument("--threshold", type=float, default=0.1, help="relative slowdown flagged as regression")
+    parser.add_argument("--fail_on_regression", action="store_true")
+    parser.add_argument("--ffmpeg", type=str, default=ffmpeg_bin)
+    parser.add_argument("--ffprobe", type=str, default=ffprobe_bin)
+
+    args = parser.parse_args()
+    ffmpeg_bin = args.ffmpeg
+    ffprobe_bin = args.ffprobe
+    size = tuple(int(x) for x in args.resolution.split("x"))
+    results_path = args.results or os.path.join(args.workfolder, "results.jsonl")
+
+    regressions = run_benchmarks(
+        work_folder=args.workfolder,
+        results_path=results_path,
+        shot_counts=args.shots,
+        length=args.length,
+        size=size,
+        fps_list=args.frames_per_second,
+        repeat=args.repeat,
+        jobs=args.jobs,
+        profile=args.profile,
+        threshold=args.threshold
+        )
+    print("Results saved to: {}".format(results_path))
+    if regressions and args.fail_on_regression:
+        sys.exit(1)
@@ -1,64 +1,87 @@
-import json, os, subprocess
+import json, os
+from concurrent.futures import ThreadPoolExecutor
+from editbot_main import getMediaProbe, defaultCacheFolder
 
-ffmpeg_bin=r"C:\Program Files\ffmpeg\bin\ffmpeg", 
+ffmpeg_bin=r"C:\Program Files\ffmpeg\bin\ffmpeg"
 ffprobe_bin=r"C:\Program Files\ffmpeg\bin\ffprobe"
+cache_folder=defaultCacheFolder()
 
-def list_video_files_in_folder(foldername, ext=".mp4"):
+def list_video_files_in_folder(foldername, ext=".mp4", recursive=False):
+    # ext can be a single extension or a list of them, matched case insensitive
+    return [path for path, stat in scan_video_files(foldername, ext, recursive)]
+
+def scan_video_files(foldername, ext=".mp4", recursive=False):
+    # returns (path, stat) for every video file, the stat comes with the folder listing for free
+    extensions = tuple(e.lower() for e in ([ext] if isinstance(ext, str) else ext))
     video_files = []
-    folder_list = os.listdir(foldername)
-    for vf in [os.path.join(foldername, filename) for filename in folder_list]:
-        if os.path.isfile(vf) and vf.endswith(ext):
-            video_files.append(vf)
-    
+    with os.scandir(foldername) as scan:
+        for entry in scan:
+            if entry.is_file() and entry.name.lower().endswith(extensions):
+                video_files.append((entry.path, entry.stat()))
+            elif recursive and entry.is_dir():
+                video_files.extend(scan_video_files(entry.path, extensions, recursive=True))
     return video_files
 
+def get_video_info(clip_path, stat=None):
+    # one cached ffprobe call per file, shared with the edit builder
+    return getMediaProbe(ffprobe_bin, os.path.join(cache_folder, 'probe_cache.jsonl')).probe(clip_path, stat)
+
 def get_video_duration(clip_path):
-    out = subprocess.check_output([ffprobe_bin,str(clip_path),"-v","0","-select_streams","v","-print_format","flat","-show_entries","stream=duration"], text=True)
-    duration = out.split('=')[1].strip()[1:-1].split('/')
-    if len(duration)==1:
-        return float(duration[0])
-    if len(duration)==2:
-        return float(duration[0])/float(duration[1])
+    info = get_video_info(clip_path)
+    return info.duration if info else -1
 
 def get_video_fps(clip_path):
-    out = subprocess.check_output([ffprobe_bin,str(clip_path),"-v","0","-select_streams","v","-print_format","flat","-show_entries","stream=r_frame_rate"], text=True)
-    rate = out.split('=')[1].strip()[1:-1].split('/')
-    if len(rate)==1:
-        return float(rate[0])
-    if len(rate)==2:
-        return float(rate[0])/float(rate[1])
-    return -1
-
-def create_config_from_folder(edit_desc_path, edit_desc_name, foldername, alphabetical_sort=True):
+    info = get_video_info(clip_path)
+    return info.fps if info else -1
 
-    videos = list_video_files_in_folder(foldername)
-    video_dict = []
+def load_config_entries(config_path):
+    # entries of an existing config by path, only configs written with the path and stat of each file can be reused
+    try:
+        with open(config_path, "r") as config_file:
+            return {entry["path"]: entry for entry in json.load(config_file) if "path" in entry}
+    except (OSError, ValueError, TypeError):
+        return {}
 
-    for vf in videos:
-        name = os.path.splitext(os.path.basename(vf))[0]
-        duration = get_video_duration(vf)
-        framerate = get_video_fps(vf)
+def create_config_from_folder(edit_desc_path, edit_desc_name, foldername, alphabetical_sort=True, recursive=False, ext=(".mp4",), jobs=0, incremental=False):
+    '''writes an edit config with every video file in foldername, probing jobs files in parallel (0 uses all cpus).
+    ext is an extension or list of extensions, recursive includes all subfolders.
+    With incremental, entries of an existing config are reused for files whose size and modification time did not change.'''
+    config_path = os.path.join(edit_desc_path, edit_desc_name)
+    videos = scan_video_files(foldername, ext, recursive)
+    previous = load_config_entries(config_path) if incremental else {}
 
-        clip_dict = {
-            "name": name,
-            "durationSeconds": duration,
-            "fps": framerate,
-            "startFrame": 0
+    def make_entry(video):
+        vf, stat = video
+        entry = previous.get(vf)
+        if entry and entry.get("size")==stat.st_size and entry.get("mtime_ns")==stat.st_mtime_ns:
+            return entry
+        info = get_video_info(vf, stat)
+        return {
+            "name": os.path.splitext(os.path.basename(vf))[0],
+            "durationSeconds": info.duration if info else -1,
+            "fps": info.fps if info else -1,
+            "startFrame": 0,
+            "path": vf,
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns
         }
 
-        video_dict.append(clip_dict)
-    
-    if alphabetical_sort:
-        video_dict_sorted = sorted(video_dict, key=lambda x: [x["name"]])
+    with ThreadPoolExecutor(max_workers=jobs or os.cpu_count() or 1) as pool:
+        video_dict = list(pool.map(make_entry, videos))
 
-    json_str=(json.dumps(video_dict, indent=4))
+    if alphabetical_sort:
+        video_dict = sorted(video_dict, key=lambda x: [x["name"], x["path"]])
 
-    # Writing to sample.json
-    with open(os.path.join(edit_desc_path, edit_desc_name), "w") as outfile:
-        outfile.write(json_str)
+    # entries are written one by one, next to the config and moved in place when complete
+    with open(config_path+".tmp", "w") as outfile:
+        outfile.write("[\n")
+        for i, clip_dict in enumerate(video_dict):
+            outfile.write(("    " if i==0 else ",\n    ")+json.dumps(clip_dict))
+        outfile.write("\n]\n")
+    os.replace(config_path+".tmp", config_path)
     return ({
-        "resultpath": os.path.join(edit_desc_path, edit_desc_name),
-        "json": json.loads(json_str)
+        "resultpath": config_path,
+        "json": video_dict
         })
 
 if __name__ == "__main__":
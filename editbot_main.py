@@ -1,6 +1,8 @@
 from __future__ import annotations
-import os, json, datetime, subprocess, re, mimetypes, tempfile, shutil, glob, sys
-from dataclasses import dataclass, field
+import os, json, datetime, subprocess, re, mimetypes, tempfile, shutil, sys, threading, hashlib, time, fnmatch, collections, asyncio, uuid, platform, bisect, functools
+from fractions import Fraction
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, asdict, replace
 from typing import Optional, Dict, Any, List, overload
 from pathlib import Path
 
@@ -18,11 +20,846 @@ class Config:
     enable_shotmask: bool=True
     clip_size: tuple=(1920,1080)
     fps: int=24
+    preconvert_jobs: int=1 #number of clips converted in parallel, 0 uses all cpus
+    cache_folder: str='' #persistent cache for probed metadata and converted clips, defaults to ~/.editbot
+    probe_cache: bool=True
+    clip_cache: bool=True #reuse converted clips across builds
+    clip_cache_size: int=20*1024**3 #in bytes, least recently used clips are removed above this size
+    burn_timecode: bool=False #draws the edit timecode while converting clips, so build() can join them without re-encoding
+    graph_max_clips: int=40 #renderGraph falls back to converting clips one by one above this
+    graph_max_length: int=30000 #maximum length of the ffmpeg command for renderGraph
+    prerender_shotmask: bool=True #renders the static part of the shotmask once per clip instead of drawing it on every frame
+    encoding_profile: str='review' #name of the profile in encoding_profiles used for builds
+    encoding_profiles: Dict[str, EncodingProfile]=field(default_factory=lambda: defaultEncodingProfiles())
+    ffmpeg_timeout: float=None #in seconds, ffmpeg jobs running longer are killed and reported as failed
+    build_report: bool=False #writes a json timing report and a prometheus textfile next to the build output
+    source_audio: bool=False #builds get the audio of every clip, silence for slates, missing media and clips without audio
+    audio_codec: str='aac'
+    audio_bitrate: str='192k'
+    audio_rate: int=48000
+    chunk_length: float=0 #in seconds, clips longer than twice this are split at keyframes and the chunks converted in parallel, 0 disables
+    chunk_jobs: int=0 #chunks of a clip converted in parallel, 0 uses all cpus. When converting an edit at most its share of the preconvert jobs
+    throughput_history: bool=True #records the measured encoding speed in the cache folder, Edit.plan() estimates builds from it
 
     def __post_init__(self):
         assert os.path.isfile(self.ffmpeg_bin), "{} does not exist, ffmpeg is unavailable".format(self.ffmpeg_bin)
         assert os.path.isfile(self.ffprobe_bin), "{} does not exist, ffprobe is unavailable".format(self.ffprobe_bin)
-        
+        if not self.cache_folder:
+            self.cache_folder=defaultCacheFolder()
+
+    def getMediaProbe(self, ffprobe_bin: str='') ->MediaProbe:
+        if not ffprobe_bin:
+            ffprobe_bin=self.ffprobe_bin
+        cache_path=os.path.join(self.cache_folder, 'probe_cache.jsonl') if self.probe_cache else ''
+        return getMediaProbe(ffprobe_bin, cache_path)
+
+    def getEncodingProfile(self, profile: Any=None) ->EncodingProfile:
+        '''returns the profile by name, a profile passed in is returned as is'''
+        if isinstance(profile, EncodingProfile):
+            return profile
+        if not profile:
+            profile=self.encoding_profile
+        assert profile in self.encoding_profiles, "Unknown encoding profile {}, choose one of {}".format(profile, list(self.encoding_profiles))
+        return self.encoding_profiles[profile]
+
+    def getClipCache(self) ->Optional[ClipCache]:
+        if not self.clip_cache:
+            return None
+        return ClipCache(folder=os.path.join(self.cache_folder, 'clips'), max_size=self.clip_cache_size)
+
+    def getThroughputHistoryPath(self) ->str:
+        return os.path.join(self.cache_folder, 'throughput.jsonl')
+
+@dataclass
+class EncodeSettings:
+    codec: str='libx264'
+    preset: str='medium' #empty for codecs without presets
+    crf: int=23 #None for codecs without crf
+    pix_fmt: str='yuv420p'
+    gop: int=None #keyframe interval in frames, 1 encodes every frame as a keyframe, None uses the codec default
+    threads: int=0 #0 lets ffmpeg decide
+    extra_args: List[str]=field(default_factory=list)
+
+    def args(self) ->List[str]:
+        args=['-c:v', self.codec]
+        if self.preset:
+            args.extend(['-preset', self.preset])
+        if self.crf is not None:
+            args.extend(['-crf', str(self.crf)])
+        if self.gop:
+            args.extend(['-g', str(self.gop)])
+        if self.threads:
+            args.extend(['-threads', str(self.threads)])
+        # the same pixel format lets the concat demuxer join clips without re-encoding
+        args.extend(['-pix_fmt', self.pix_fmt])
+        args.extend(self.extra_args)
+        return args
+
+    def label(self) ->str:
+        '''the settings that change the encoding speed, the measured throughput is kept per label'''
+        parts=[self.codec, self.preset, 'crf{}'.format(self.crf) if self.crf is not None else '', 'gop{}'.format(self.gop) if self.gop else '',
+            self.pix_fmt, 'threads{}'.format(self.threads) if self.threads else '']+self.extra_args
+        return ' '.join(str(part) for part in parts if part)
+
+# intermediate clips share the mp4 timescale of copied clips, so the concat demuxer joins them without re-encoding
+INTERMEDIATE_MUX_ARGS = ['-video_track_timescale', '90000']
+
+# codec names ffprobe reports for the output of an encoder, used to find sources that can be copied
+ENCODER_CODECS = {
+    'libx264': 'h264',
+    'libx265': 'hevc',
+    'libvpx-vp9': 'vp9',
+    'libaom-av1': 'av1',
+    'libsvtav1': 'av1',
+    'prores_ks': 'prores',
+}
+
+@dataclass
+class EncodingProfile:
+    '''encoder settings for the converted clips (intermediate) and the built edit (final).
+    When the timecode is burned into the clips, they are joined without re-encoding and use the final settings.'''
+    name: str
+    intermediate: EncodeSettings
+    final: EncodeSettings
+
+def defaultEncodingProfiles() ->Dict[str, EncodingProfile]:
+    # intermediates are all intra, they encode fast and are only read once more by the final build
+    return {
+        'draft': EncodingProfile(
+            name='draft',
+            intermediate=EncodeSettings(preset='ultrafast', crf=28, gop=1),
+            final=EncodeSettings(preset='veryfast', crf=28)
+        ),
+        'review': EncodingProfile(
+            name='review',
+            intermediate=EncodeSettings(preset='veryfast', crf=16, gop=1),
+            final=EncodeSettings(preset='medium', crf=21)
+        ),
+        'delivery': EncodingProfile(
+            name='delivery',
+            intermediate=EncodeSettings(preset='fast', crf=10, gop=1),
+            final=EncodeSettings(preset='slow', crf=17)
+        ),
+    }
+
+def defaultCacheFolder() ->str:
+    return os.path.join(Path.home(), '.editbot')
+
+@dataclass
+class MediaInfo:
+    path: str
+    size: int
+    mtime_ns: int
+    duration: float=0
+    fps: float=0
+    width: int=0
+    height: int=0
+    codec: str=''
+    pix_fmt: str=''
+    frame_count: int=0
+    has_audio: bool=None #None for entries probed before audio was read
+
+def parseRate(rate: str) ->float:
+    # ffprobe reports rates as fractions like 30000/1001
+    if not rate:
+        return 0
+    rate = rate.split('/')
+    if len(rate)==2:
+        return float(rate[0])/float(rate[1]) if float(rate[1]) else 0
+    return float(rate[0])
+
+@dataclass
+class MediaProbe:
+    '''gets all metadata of a video file with a single ffprobe call.
+    Results are cached in memory and, if a cache_path is set, in a json lines file on disk.
+    Entries are keyed by path, size and mtime, so changed files are probed again.
+    The cache file is compacted on load once it holds more than compact_after superseded or unreadable lines.'''
+    ffprobe_bin: str
+    cache_path: str=''
+    compact_after: int=1000
+    _entries: Dict[str, MediaInfo]=field(init=False, repr=False)
+    _lock: threading.Lock=field(init=False, repr=False)
+    _keyframes: Dict[tuple, List[float]]=field(init=False, repr=False)
+    hits: int=field(init=False, default=0)
+    misses: int=field(init=False, default=0)
+    probe_time: float=field(init=False, default=0) #seconds spent in ffprobe
+
+    def __post_init__(self):
+        self._entries={}
+        self._keyframes={}
+        self._lock=threading.Lock()
+        if self.cache_path and os.path.isfile(self.cache_path):
+            self.loadCache()
+
+    def loadCache(self):
+        # later lines win, the file is append only
+        lines=0
+        with open(self.cache_path, 'r') as cache_file:
+            for line in cache_file:
+                lines+=1
+                try:
+                    info=MediaInfo(**json.loads(line))
+                except (ValueError, TypeError):
+                    continue
+                self._entries[info.path]=info
+        # every probe of a changed file appends a line, the older ones are dropped
+        if lines-len(self._entries)>self.compact_after:
+            try:
+                self.compactCache()
+            except OSError as e:
+                print('Error when compacting {}\n{}'.format(self.cache_path, e))
+
+    def compactCache(self):
+        '''rewrites the cache file with only the current entries'''
+        if not self.cache_path:
+            return
+        with self._lock:
+            temp_path=self.cache_path+'.tmp'
+            with open(temp_path, 'w') as cache_file:
+                for info in self._entries.values():
+                    cache_file.write(json.dumps(info.__dict__)+'\n')
+            os.replace(temp_path, self.cache_path)
+
+    def probe(self, path: str, stat: os.stat_result=None) ->Optional[MediaInfo]:
+        '''returns the MediaInfo for path or None if it can't be probed.
+        An already known os.stat_result can be passed to skip the stat call.'''
+        path, stat, info=self._lookup(path, stat)
+        if info or stat is None:
+            return info
+
+        start=time.time()
+        try:
+            out = subprocess.check_output(self._probeArgs(path), text=True)
+        except (subprocess.CalledProcessError, OSError) as e:
+            out = None
+            print("Error when probing {}\n{}".format(path, e))
+        return self._store(path, stat, out, start)
+
+    async def probeAsync(self, path: str, stat: os.stat_result=None) ->Optional[MediaInfo]:
+        '''like probe, but runs ffprobe as asyncio subprocess'''
+        path, stat, info=self._lookup(path, stat)
+        if info or stat is None:
+            return info
+
+        start=time.time()
+        try:
+            process = await asyncio.create_subprocess_exec(*self._probeArgs(path), stdin=subprocess.DEVNULL, stdout=subprocess.PIPE)
+            try:
+                out, _ = await process.communicate()
+            except asyncio.CancelledError:
+                process.kill()
+                raise
+            out = out.decode(errors='replace')
+            if process.returncode!=0:
+                print("Error when probing {}\nffprobe exited with {}".format(path, process.returncode))
+                out = None
+        except OSError as e:
+            out = None
+            print("Error when probing {}\n{}".format(path, e))
+        return self._store(path, stat, out, start)
+
+    def keyframes(self, path: str) ->List[float]:
+        '''returns the times of all keyframes of the first video stream in seconds.
+        Only the packets are read, nothing is decoded. Results are kept in memory by path, size and mtime.
+        Returns an empty list if they can't be read.'''
+        key=tuple(fileIdentity(path) or [str(path)])
+        with self._lock:
+            if key in self._keyframes:
+                return self._keyframes[key]
+        try:
+            out = subprocess.check_output([
+                self.ffprobe_bin, str(path), "-v", "error", "-select_streams", "v:0",
+                "-show_entries", "packet=pts_time,flags", "-of", "csv=p=0"
+                ], text=True)
+        except (subprocess.CalledProcessError, OSError) as e:
+            print("Error when reading keyframes of {}\n{}".format(path, e))
+            return []
+        keyframes=[]
+        for line in out.splitlines():
+            pts_time, _, flags = line.partition(',')
+            if 'K' in flags:
+                try:
+                    keyframes.append(float(pts_time))
+                except ValueError:
+                    continue
+        keyframes.sort()
+        with self._lock:
+            self._keyframes[key]=keyframes
+        return keyframes
+
+    def _lookup(self, path: str, stat: os.stat_result=None) ->tuple:
+        # returns the absolute path, its stat and the cached info if it is still valid
+        path=os.path.abspath(str(path))
+        if stat is None:
+            try:
+                stat=os.stat(path)
+            except OSError:
+                sys.stderr.write("ERROR: filename %r was not found!" % (path,))
+                return path, None, None
+        with self._lock:
+            info=self._entries.get(path)
+            if info and info.size==stat.st_size and info.mtime_ns==stat.st_mtime_ns and info.has_audio is not None:
+                self.hits+=1
+                return path, stat, info
+        return path, stat, None
+
+    def _store(self, path: str, stat: os.stat_result, out: str, start: float) ->Optional[MediaInfo]:
+        with self._lock:
+            self.misses+=1
+            self.probe_time+=time.time()-start
+        info=self._parseProbe(path, stat, out) if out is not None else None
+        if info is None:
+            return None
+        with self._lock:
+            self._entries[path]=info
+            if self.cache_path:
+                os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+                with open(self.cache_path, 'a') as cache_file:
+                    cache_file.write(json.dumps(info.__dict__)+'\n')
+        return info
+
+    def _probeArgs(self, path: str) ->List[str]:
+        return [
+            self.ffprobe_bin, path, "-v", "error", "-print_format", "json",
+            "-show_entries", "stream=codec_type,codec_name,pix_fmt,width,height,r_frame_rate,duration,nb_frames:format=duration"
+            ]
+
+    def _parseProbe(self, path: str, stat: os.stat_result, out: str) ->Optional[MediaInfo]:
+        try:
+            data=json.loads(out)
+        except ValueError as e:
+            print("Error when probing {}\n{}".format(path, e))
+            return None
+        streams=data.get('streams') or []
+        video_streams=[stream for stream in streams if stream.get('codec_type', 'video')=='video']
+        if not video_streams:
+            print("No video stream found in {}".format(path))
+            return None
+        stream=video_streams[0]
+        fps=parseRate(stream.get('r_frame_rate', ''))
+        duration=float(stream.get('duration') or data.get('format', {}).get('duration') or 0)
+        frame_count=int(stream['nb_frames']) if str(stream.get('nb_frames', '')).isdigit() else round(duration*fps)
+        return MediaInfo(
+            path=path,
+            size=stat.st_size,
+            mtime_ns=stat.st_mtime_ns,
+            duration=duration,
+            fps=fps,
+            width=int(stream.get('width', 0)),
+            height=int(stream.get('height', 0)),
+            codec=stream.get('codec_name', ''),
+            pix_fmt=stream.get('pix_fmt', ''),
+            frame_count=frame_count,
+            has_audio=any(s.get('codec_type')=='audio' for s in streams)
+        )
+
+_media_probes: Dict[tuple, MediaProbe] = {}
+_media_probes_lock = threading.Lock()
+
+def getMediaProbe(ffprobe_bin: str, cache_path: str='') ->MediaProbe:
+    '''returns a shared MediaProbe, so all clips using the same cache share its entries'''
+    with _media_probes_lock:
+        key=(str(ffprobe_bin), cache_path)
+        if key not in _media_probes:
+            _media_probes[key]=MediaProbe(ffprobe_bin=str(ffprobe_bin), cache_path=cache_path)
+        return _media_probes[key]
+
+# bump this when the conversion changes in a way that is not part of the cache keys
+CLIP_CACHE_VERSION = 2
+
+def hashCacheKey(key_data: Dict) ->str:
+    return hashlib.sha1(json.dumps(key_data, sort_keys=True, default=str).encode()).hexdigest()
+
+def fileIdentity(path: str) ->Optional[list]:
+    try:
+        stat=os.stat(str(path))
+    except OSError:
+        return None
+    return [os.path.abspath(str(path)), stat.st_size, stat.st_mtime_ns]
+
+@dataclass
+class ClipCache:
+    '''persistent store of converted clips, keyed by a hash of everything that affects the output.
+    Clips are converted to a partial file inside the cache and moved in place when done.
+    Above max_size the least recently used clips are removed.'''
+    folder: str
+    max_size: int=20*1024**3
+
+    def __post_init__(self):
+        os.makedirs(self.folder, exist_ok=True)
+
+    def path(self, key: str) ->str:
+        return os.path.join(self.folder, '{}.mp4'.format(key))
+
+    def lookup(self, key: str) ->Optional[str]:
+        cached_path=self.path(key)
+        try:
+            # the modification time is used as last access time for the eviction
+            os.utime(cached_path)
+        except OSError:
+            return None
+        return cached_path
+
+    def contains(self, key: str) ->bool:
+        '''like lookup, without marking the clip as used'''
+        return os.path.isfile(self.path(key))
+
+    def partialPath(self, key: str) ->str:
+        handle, partial_path=tempfile.mkstemp(prefix='{}.'.format(key), suffix='.partial.mp4', dir=self.folder)
+        os.close(handle)
+        return partial_path
+
+    def commit(self, key: str, partial_path: str) ->Optional[str]:
+        if not os.path.isfile(partial_path) or os.path.getsize(partial_path)==0:
+            self.discard(partial_path)
+            return None
+        cached_path=self.path(key)
+        try:
+            os.replace(partial_path, cached_path)
+        except OSError:
+            # converted on another drive, like a shared render queue
+            cached_path=self.store(key, partial_path)
+            self.discard(partial_path)
+        return cached_path
+
+    def store(self, key: str, path: str) ->Optional[str]:
+        '''copies a clip converted outside of the cache, like on another node, into the cache'''
+        partial_path=self.partialPath(key)
+        try:
+            shutil.copyfile(path, partial_path)
+        except OSError:
+            self.discard(partial_path)
+            return None
+        return self.commit(key, partial_path)
+
+    def discard(self, partial_path: str):
+        try:
+            os.remove(partial_path)
+        except OSError:
+            pass
+
+    def evict(self, keep: List[str]=()) ->int:
+        '''removes the least recently used clips until the cache is below max_size, clips in keep are never removed.
+        Returns the number of bytes removed.'''
+        keep=set(self.path(k) for k in keep if k)
+        entries=[]
+        now=time.time()
+        with os.scandir(self.folder) as scan:
+            for entry in scan:
+                if not entry.is_file():
+                    continue
+                stat=entry.stat()
+                if entry.name.endswith('.partial.mp4'):
+                    # leftovers of crashed conversions
+                    if now-stat.st_mtime>24*60*60:
+                        self.discard(entry.path)
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total=sum(e[1] for e in entries)
+        removed=0
+        for mtime, size, cached_path in sorted(entries):
+            if total-removed<=self.max_size:
+                break
+            if cached_path in keep:
+                continue
+            self.discard(cached_path)
+            removed+=size
+        return removed
+
+@dataclass
+class FFmpegJob:
+    '''one ffmpeg call, args are everything after the ffmpeg binary'''
+    args: List[str]
+    output_path: str=''
+    name: str=''
+    timeout: float=None #in seconds, None runs until ffmpeg is done
+    frames: int=0 #expected number of frames, used for progress
+
+@dataclass
+class FFmpegProgress:
+    name: str
+    frames: int=0
+    fps: float=0
+    speed: float=0
+    out_time: float=0 #in seconds
+    total_frames: int=0
+    done: bool=False
+
+@dataclass
+class FFmpegResult:
+    name: str
+    args: List[str]
+    returncode: int
+    wall_time: float
+    output_path: str=''
+    frames: int=0
+    fps: float=0
+    speed: float=0
+    out_time: float=0
+    bytes_written: int=0
+    error: str=''
+    timed_out: bool=False
+    cancelled: bool=False
+    method: str='' #how a clip conversion ran: copy, chunked or full
+
+    @property
+    def success(self) ->bool:
+        return self.returncode==0 and not self.timed_out and not self.cancelled
+
+def _parseProgressValue(value: str) ->float:
+    try:
+        return float(value.strip().rstrip('x'))
+    except ValueError:
+        return 0
+
+def runFFmpeg(ffmpeg_bin: str, job: FFmpegJob, on_progress=None, cancel_event: threading.Event=None) ->FFmpegResult:
+    '''runs an ffmpeg job and parses its -progress output.
+    on_progress is called with a FFmpegProgress for every progress block ffmpeg writes.
+    The job is killed when its timeout is reached or cancel_event is set.'''
+    args=[str(ffmpeg_bin), '-progress', 'pipe:1', '-nostats']+[str(a) for a in job.args]
+    start=time.perf_counter()
+    if cancel_event is not None and cancel_event.is_set():
+        return FFmpegResult(name=job.name, args=args, returncode=-1, wall_time=0, output_path=job.output_path, cancelled=True)
+    try:
+        process=subprocess.Popen(args, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, errors='replace')
+    except OSError as e:
+        return FFmpegResult(name=job.name, args=args, returncode=-1, wall_time=0, output_path=job.output_path, error=str(e))
+
+    # stderr is read on its own thread so neither pipe can fill up and block ffmpeg
+    stderr_tail=collections.deque(maxlen=20)
+    stderr_thread=threading.Thread(target=lambda: [stderr_tail.append(line.rstrip()) for line in process.stderr], daemon=True)
+    stderr_thread.start()
+
+    stopped={}
+    def watch():
+        while process.poll() is None:
+            if cancel_event is not None and cancel_event.is_set():
+                stopped['cancelled']=True
+            elif job.timeout and time.perf_counter()-start>job.timeout:
+                stopped['timed_out']=True
+            if stopped:
+                process.kill()
+                return
+            time.sleep(0.1)
+    watch_thread=None
+    if job.timeout or cancel_event is not None:
+        watch_thread=threading.Thread(target=watch, daemon=True)
+        watch_thread.start()
+
+    progress=FFmpegProgress(name=job.name, total_frames=job.frames)
+    for line in process.stdout:
+        _updateProgress(progress, line, on_progress)
+    returncode=process.wait()
+    stderr_thread.join()
+    if watch_thread:
+        watch_thread.join()
+    return _makeResult(job, args, returncode, start, progress, stderr_tail, stopped)
+
+async def runFFmpegAsync(ffmpeg_bin: str, job: FFmpegJob, on_progress=None, cancel_event: threading.Event=None) ->FFmpegResult:
+    '''runs an ffmpeg job as asyncio subprocess, like runFFmpeg.
+    If the awaiting task is cancelled, ffmpeg is killed before the cancellation is passed on.'''
+    args=[str(ffmpeg_bin), '-progress', 'pipe:1', '-nostats']+[str(a) for a in job.args]
+    start=time.perf_counter()
+    if cancel_event is not None and cancel_event.is_set():
+        return FFmpegResult(name=job.name, args=args, returncode=-1, wall_time=0, output_path=job.output_path, cancelled=True)
+    try:
+        process=await asyncio.create_subprocess_exec(*args, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    except OSError as e:
+        return FFmpegResult(name=job.name, args=args, returncode=-1, wall_time=0, output_path=job.output_path, error=str(e))
+
+    stderr_tail=collections.deque(maxlen=20)
+    progress=FFmpegProgress(name=job.name, total_frames=job.frames)
+    async def readStderr():
+        async for line in process.stderr:
+            stderr_tail.append(line.decode(errors='replace').rstrip())
+    async def readProgress():
+        async for line in process.stdout:
+            _updateProgress(progress, line.decode(errors='replace'), on_progress)
+        return await process.wait()
+
+    stopped={}
+    async def watch():
+        while process.returncode is None:
+            if cancel_event is not None and cancel_event.is_set():
+                stopped['cancelled']=True
+                process.kill()
+                return
+            await asyncio.sleep(0.1)
+    watch_task=asyncio.ensure_future(watch()) if cancel_event is not None else None
+    try:
+        returncode=(await asyncio.wait_for(asyncio.gather(readProgress(), readStderr()), timeout=job.timeout))[0]
+    except asyncio.TimeoutError:
+        stopped['timed_out']=True
+        process.kill()
+        returncode=await process.wait()
+    except asyncio.CancelledError:
+        process.kill()
+        await process.wait()
+        raise
+    finally:
+        if watch_task:
+            watch_task.cancel()
+    return _makeResult(job, args, returncode, start, progress, stderr_tail, stopped)
+
+def _updateProgress(progress: FFmpegProgress, line: str, on_progress=None):
+    key, _, value = line.strip().partition('=')
+    if key=='frame':
+        progress.frames=int(_parseProgressValue(value))
+    elif key=='fps':
+        progress.fps=_parseProgressValue(value)
+    elif key=='speed':
+        progress.speed=_parseProgressValue(value)
+    elif key in ('out_time_us', 'out_time_ms'):
+        # both are in microseconds
+        progress.out_time=_parseProgressValue(value)/1000000
+    elif key=='progress':
+        progress.done=(value=='end')
+        if on_progress:
+            on_progress(progress)
+
+def _makeResult(job: FFmpegJob, args: List[str], returncode: int, start: float, progress: FFmpegProgress, stderr_tail: collections.deque, stopped: Dict) ->FFmpegResult:
+    wall_time=time.perf_counter()-start
+    bytes_written=os.path.getsize(job.output_path) if job.output_path and os.path.isfile(job.output_path) else 0
+    return FFmpegResult(
+        name=job.name,
+        args=args,
+        returncode=returncode,
+        wall_time=wall_time,
+        output_path=job.output_path,
+        frames=progress.frames,
+        fps=progress.frames/wall_time if wall_time>0 else 0,
+        speed=progress.speed,
+        out_time=progress.out_time,
+        bytes_written=bytes_written,
+        error='\n'.join(stderr_tail),
+        timed_out=stopped.get('timed_out', False),
+        cancelled=stopped.get('cancelled', False)
+    )
+
+def reportResult(result: FFmpegResult) ->bool:
+    '''prints a one line summary of a finished job, returns if it was successful'''
+    if result.success:
+        print('{name}: {frames} frames in {wall_time:.1f}s ({fps:.1f} fps, {speed:.2f}x)'.format(
+            name=result.name, frames=result.frames, wall_time=result.wall_time, fps=result.fps, speed=result.speed))
+    elif result.cancelled:
+        print('{}: cancelled'.format(result.name))
+    elif result.timed_out:
+        print('{}: timed out after {:.1f}s'.format(result.name, result.wall_time))
+    else:
+        print('{}: ffmpeg failed with exit code {}\n{}'.format(result.name, result.returncode, result.error))
+    return result.success
+
+@dataclass
+class QueueJob:
+    '''a clip conversion in a WorkQueue. args are the ffmpeg arguments without the binary,
+    clip holds the name, source, trim and shotmask of the clip so the queue can be inspected.'''
+    id: str
+    args: List[str]
+    output_path: str
+    name: str=''
+    frames: int=0
+    timeout: float=None
+    clip: Dict=field(default_factory=dict)
+    attempts: int=0
+    max_attempts: int=3
+    worker: str=''
+    claimed: float=0 #unix time the current attempt started
+    stolen: bool=False #set on the copy of a job another worker took over from a slow node
+    result: Dict=field(default_factory=dict) #the FFmpegResult of the finished job
+
+@dataclass
+class WorkQueue:
+    '''a job queue in a shared folder, no broker needed. Every job is a json file that moves between
+    pending, running, done and failed. Workers claim jobs by renaming them, which only one of them can do.
+    Running jobs are touched as heartbeat, jobs of nodes that stopped sending it are requeued after stale_after seconds.
+    Idle workers start a copy of jobs running longer than steal_after seconds, the first one finishing wins.'''
+    folder: str
+    stale_after: float=120
+    steal_after: float=300
+
+    def __post_init__(self):
+        for state in ('pending', 'running', 'done', 'failed', 'outputs', 'assets'):
+            os.makedirs(os.path.join(self.folder, state), exist_ok=True)
+
+    def path(self, state: str, job_id: str) ->str:
+        return os.path.join(self.folder, state, '{}.json'.format(job_id))
+
+    def status(self, job_id: str) ->str:
+        for state in ('done', 'failed', 'running', 'pending'):
+            if os.path.isfile(self.path(state, job_id)):
+                return state
+        return ''
+
+    def read(self, state: str, job_id: str) ->Optional[QueueJob]:
+        try:
+            with open(self.path(state, job_id), 'r') as job_file:
+                return QueueJob(**json.load(job_file))
+        except (OSError, ValueError, TypeError):
+            return None
+
+    def write(self, state: str, job: QueueJob):
+        # written next to the target and renamed, so nobody reads a half written job
+        job_path=self.path(state, job.id)
+        temp_path='{}.{}.tmp'.format(job_path, uuid.uuid4().hex)
+        with open(temp_path, 'w') as job_file:
+            json.dump(asdict(job), job_file, default=str)
+        os.replace(temp_path, job_path)
+
+    def submit(self, job: QueueJob):
+        self.write('pending', job)
+
+    def shareFile(self, path: str) ->str:
+        '''copies a local file, like a prerendered overlay, into the queue so all workers can read it'''
+        shared_path=os.path.join(self.folder, 'assets', os.path.basename(path))
+        if not os.path.isfile(shared_path):
+            temp_path='{}.{}.tmp'.format(shared_path, uuid.uuid4().hex)
+            shutil.copyfile(path, temp_path)
+            os.replace(temp_path, shared_path)
+        return shared_path
+
+    def _ids(self, state: str) ->List[str]:
+        return sorted(name[:-len('.json')] for name in os.listdir(os.path.join(self.folder, state)) if name.endswith('.json'))
+
+    def claim(self, worker: str) ->Optional[QueueJob]:
+        '''takes the first pending job, returns None if there is none'''
+        for job_id in self._ids('pending'):
+            try:
+                os.rename(self.path('pending', job_id), self.path('running', job_id))
+                # the rename keeps the old mtime, which would look like a stale job
+                os.utime(self.path('running', job_id))
+            except OSError:
+                # another worker was faster
+                continue
+            job=self.read('running', job_id)
+            if job is None:
+                continue
+            job.worker=worker
+            job.claimed=time.time()
+            self.write('running', job)
+            return job
+        return None
+
+    def steal(self, worker: str) ->Optional[QueueJob]:
+        '''starts a copy of the job that is running the longest, if it runs longer than steal_after.
+        Every job is only stolen once.'''
+        now=time.time()
+        candidates=[job for job in (self.read('running', job_id) for job_id in self._ids('running')) if job and job.claimed and now-job.claimed>self.steal_after]
+        for job in sorted(candidates, key=lambda job: job.claimed):
+            try:
+                os.close(os.open(os.path.join(self.folder, 'running', '{}.steal'.format(job.id)), os.O_CREAT|os.O_EXCL|os.O_WRONLY))
+            except OSError:
+                continue
+            print('{} takes over {} from {}'.format(worker, job.id, job.worker))
+            job.worker=worker
+            job.stolen=True
+            return job
+        return None
+
+    def requeueStale(self) ->int:
+        '''moves running jobs without heartbeat back to pending, returns the number of requeued jobs'''
+        requeued=0
+        now=time.time()
+        for job_id in self._ids('running'):
+            running_path=self.path('running', job_id)
+            try:
+                if now-os.path.getmtime(running_path)<self.stale_after:
+                    continue
+                os.rename(running_path, self.path('pending', job_id))
+            except OSError:
+                continue
+            self._removeStealMarker(job_id)
+            print('Requeued stale job {}'.format(job_id))
+            requeued+=1
+        return requeued
+
+    def _removeStealMarker(self, job_id: str):
+        try:
+            os.remove(os.path.join(self.folder, 'running', '{}.steal'.format(job_id)))
+        except OSError:
+            pass
+
+    def run(self, ffmpeg_bin: str, job: QueueJob) ->FFmpegResult:
+        '''converts a claimed job into a partial file of this worker and moves it to done or back to pending'''
+        partial_path='{}.{}.partial.mp4'.format(os.path.splitext(job.output_path)[0], uuid.uuid4().hex[:8])
+        ffmpeg_job=FFmpegJob(
+            args=[partial_path if arg==job.output_path else arg for arg in job.args],
+            output_path=partial_path,
+            name=job.name,
+            timeout=job.timeout,
+            frames=job.frames
+        )
+
+        # the heartbeat keeps the job from being requeued and stops it when another worker finished it first
+        finished=threading.Event()
+        cancel_event=threading.Event()
+        def heartbeat():
+            while not finished.wait(min(self.stale_after/4, 5)):
+                try:
+                    os.utime(self.path('running', job.id))
+                except OSError:
+                    pass
+                if os.path.isfile(self.path('done', job.id)):
+                    cancel_event.set()
+        heartbeat_thread=threading.Thread(target=heartbeat, daemon=True)
+        heartbeat_thread.start()
+        try:
+            result=runFFmpeg(ffmpeg_bin, ffmpeg_job, cancel_event=cancel_event)
+        finally:
+            finished.set()
+            heartbeat_thread.join()
+
+        if result.success and os.path.isfile(partial_path) and not os.path.isfile(self.path('done', job.id)):
+            os.replace(partial_path, job.output_path)
+            result.output_path=job.output_path
+            job.result=asdict(result)
+            self.write('done', job)
+            for state in ('running', 'pending'):
+                try:
+                    os.remove(self.path(state, job.id))
+                except OSError:
+                    pass
+            self._removeStealMarker(job.id)
+            return result
+
+        if os.path.isfile(partial_path):
+            os.remove(partial_path)
+        if os.path.isfile(self.path('done', job.id)) or job.stolen:
+            # finished by another worker, or the original worker is still on it
+            return result
+        job.attempts+=1
+        job.result=asdict(result)
+        try:
+            os.remove(self.path('running', job.id))
+        except OSError:
+            pass
+        if job.attempts<job.max_attempts:
+            print('{} failed, retrying ({}/{})'.format(job.id, job.attempts, job.max_attempts))
+            self.write('pending', job)
+        else:
+            self.write('failed', job)
+        return result
+
+    def work(self, ffmpeg_bin: str, worker: str='', poll: float=1.0, idle_timeout: float=None, stop_event: threading.Event=None) ->int:
+        '''runs jobs until stop_event is set, or until the queue was empty for idle_timeout seconds.
+        Returns the number of jobs this worker finished.'''
+        if not worker:
+            worker='{}-{}'.format(platform.node(), os.getpid())
+        finished=0
+        idle_since=time.time()
+        while stop_event is None or not stop_event.is_set():
+            self.requeueStale()
+            job=self.claim(worker) or self.steal(worker)
+            if job is None:
+                if idle_timeout is not None and time.time()-idle_since>idle_timeout:
+                    break
+                time.sleep(poll)
+                continue
+            result=self.run(ffmpeg_bin, job)
+            reportResult(result)
+            finished+=1 if result.success else 0
+            idle_since=time.time()
+        return finished
+
 @dataclass
 class ShotMask:
     mode: str
@@ -41,9 +878,13 @@ class ShotMask:
     fontsize_large: int=25
     fontsize_small: int=16
     missing_frame_color: str='orange'
+    burn_timecode: bool=False #draws the edit timecode starting at timecode into the clip
+    timecode_rate: float=24
+    overlay_path: str='' #pre-rendered static part of the mask, see renderOverlay
 
     # generates the filter string for ffmpeg - has two modes, 'clip' for the clip data and 'sequence' for the sequence data
-    def generateFilterString(self, mode: str='') -> str:
+    def generateFilterString(self, mode: str='', video_in: str='') -> str:
+        '''video_in labels the video input of the mask, needed when it is part of a larger graph'''
         if not mode:
             mode=self.mode
         logofilter="[1:v]scale=h={mask_size}-{logopadding}:force_original_aspect_ratio=1".format(mask_size=self.mask_size, logopadding=self.mask_size/6) if self.logo_path else ""
@@ -51,11 +892,11 @@ class ShotMask:
         
         # TODO: split this part into the main converter as it is not related to the shotmask
         sizefilter=(
-            "scale=w={width}:h={height}:force_original_aspect_ratio=1[0];"
+            "{video_in}scale=w={width}:h={height}:force_original_aspect_ratio=1[0];"
             "[0]pad=width={width}:height={height}:x=-1:y=-1:color=black[0];"
             "color={missing_frame_color}:{width}x{height}:r={fps}[c];"
             "[c][0]overlay=eof_action=pass"
-        ).format(width=self.scale[0], height=self.scale[1], logofilter=logofilter, missing_frame_color=self.missing_frame_color, fps=self.fps)
+        ).format(width=self.scale[0], height=self.scale[1], logofilter=logofilter, missing_frame_color=self.missing_frame_color, fps=self.fps, video_in='[{}]'.format(video_in) if video_in else '')
         
         drawmaskfilter=(
             "drawbox=x=0:y=0:w=-1:h={mask_size}:color=black@{mask_opacity}:t=fill[0];"
@@ -63,51 +904,146 @@ class ShotMask:
         ).format(mask_size=self.mask_size, mask_opacity=self.mask_opacity, logooverlay=logooverlay)
 
         if mode == "clip":
-            drawtextfilter=(
-                "drawtext=fontsize={fontsize_small}:fontcolor=white:fontfile='C\\:/Windows/fonts/consola.ttf':text='{pass_name}':x=(w-text_w)/2:y=({mask_size}/2)-(text_h/2)[0];"
-                "[0]drawtext=fontsize={fontsize_large}:fontcolor=white:fontfile='C\\:/Windows/fonts/consola.ttf':text='{shot_name}':x=w-text_w-{mask_padding}:y=({mask_size}/2)-(text_h/2)[0];"
-                "[0]drawtext=fontsize={fontsize_small}:fontcolor=white:fontfile='C\\:/Windows/fonts/consola.ttf':text='{shot_date}':x={mask_padding}:y=h-(text_h/2)-({mask_size}/3)[0];"
-                "[0]drawtext=fontsize={fontsize_large}:fontcolor=white:fontfile='C\\:/Windows/fonts/consola.ttf':text='%{{frame_num}}':start_number={start_frame}:x=w-text_w-{mask_padding}:y=h-(text_h/2)-({mask_size}/2)[0];"
-                "[0]drawtext=fontsize={fontsize_small}:fontcolor=white:fontfile='C\\:/Windows/fonts/consola.ttf':text={shot_file_name}':x={mask_padding}:y=h-(text_h/2)-(({mask_size}/3)*2)"
-            ).format(fontsize_small=self.fontsize_small, fontsize_large=self.fontsize_large, mask_size=self.mask_size, mask_padding=self.mask_padding, start_frame=self.in_frame, pass_name=self.pass_name, shot_name=self.shot_name, shot_date=self.date, shot_file_name=os.path.basename(self.file_name))
+            # with a pre-rendered overlay only the frame counter is drawn per frame
+            drawtextfilter=self._framenumFilterString() if self.overlay_path else (
+                "{statictext}[0];[0]{framenum}[0];[0]{filename}"
+            ).format(statictext=self._staticTextFilterString(), framenum=self._framenumFilterString(), filename=self._fileNameFilterString())
         elif mode == "sequence":
             drawtextfilter=(
-                "drawtext=fontsize={fontsize_small}:fontcolor=white:fontfile='C\\:/Windows/fonts/consola.ttf':timecode='00\:00\:00\:00':rate={fps}:x=(w-text_w)/2:y=h-(text_h/2)-({mask_size}/2)"
-            ).format(fontsize_small=self.fontsize_small, fontsize_large=self.fontsize_large, fps=self.fps, mask_size=self.mask_size, mask_padding=self.mask_padding)
+                "drawtext=fontsize={fontsize_small}:fontcolor=white:fontfile='C\\:/Windows/fonts/consola.ttf':timecode='{timecode}':rate={fps}:x=(w-text_w)/2:y=h-(text_h/2)-({mask_size}/2)"
+            ).format(fontsize_small=self.fontsize_small, fontsize_large=self.fontsize_large, fps=self.fps, mask_size=self.mask_size, mask_padding=self.mask_padding, timecode=self.timecode)
         else:
              drawtextfiler=""
+
+        # the edit timecode runs at the edit rate, so the clip is resampled to it first
+        timecodefilter=(
+            "[0]fps={rate}[0];"
+            "[0]drawtext=fontsize={fontsize_small}:fontcolor=white:fontfile='C\\:/Windows/fonts/consola.ttf':timecode='{timecode}':rate={rate}:x=(w-text_w)/2:y=h-(text_h/2)-({mask_size}/2)"
+        ).format(fontsize_small=self.fontsize_small, rate=self.timecode_rate, timecode=self.timecode, mask_size=self.mask_size) if self.burn_timecode else ""
         
-        if mode == "clip":
-            return '"{logofilter}[1];{sizefilter}[0];[0][1]{logooverlay}[0];[0]{drawmaskfilter}[0];[0]{drawtextfilter}"'.format(
+        if mode == "clip" and self.overlay_path:
+            return '{sizefilter}[0];[0][1:v]overlay=x=0:y=0[0];[0]{drawtextfilter}{timecodefilter}'.format(
+                sizefilter=sizefilter,
+                drawtextfilter=drawtextfilter,
+                timecodefilter="[0];"+timecodefilter if timecodefilter else ""
+                )
+        elif mode == "clip":
+            return '{logofilter}[1];{sizefilter}[0];[0][1]{logooverlay}[0];[0]{drawmaskfilter}[0];[0]{drawtextfilter}{timecodefilter}'.format(
                 logofilter=logofilter,
                 logooverlay=logooverlay,
                 sizefilter=sizefilter, 
                 drawmaskfilter=drawmaskfilter,
-                drawtextfilter=drawtextfilter
+                drawtextfilter=drawtextfilter,
+                timecodefilter="[0];"+timecodefilter if timecodefilter else ""
                 )
         elif mode == "sequence":
-            return '"{drawtextfilter}"'.format(drawtextfilter=drawtextfilter)
+            return '{drawtextfilter}'.format(drawtextfilter=drawtextfilter)
         elif mode == "resizeonly":
-            return '"{sizefilter}"'.format(sizefilter=sizefilter)
+            return '{sizefilter}{timecodefilter}'.format(sizefilter=sizefilter, timecodefilter="[0];"+timecodefilter if timecodefilter else "")
         else:
             return False
 
+    def _staticTextFilterString(self) ->str:
+        return (
+            "drawtext=fontsize={fontsize_small}:fontcolor=white:fontfile='C\\:/Windows/fonts/consola.ttf':text='{pass_name}':x=(w-text_w)/2:y=({mask_size}/2)-(text_h/2)[0];"
+            "[0]drawtext=fontsize={fontsize_large}:fontcolor=white:fontfile='C\\:/Windows/fonts/consola.ttf':text='{shot_name}':x=w-text_w-{mask_padding}:y=({mask_size}/2)-(text_h/2)[0];"
+            "[0]drawtext=fontsize={fontsize_small}:fontcolor=white:fontfile='C\\:/Windows/fonts/consola.ttf':text='{shot_date}':x={mask_padding}:y=h-(text_h/2)-({mask_size}/3)"
+        ).format(fontsize_small=self.fontsize_small, fontsize_large=self.fontsize_large, mask_size=self.mask_size, mask_padding=self.mask_padding, pass_name=self.pass_name, shot_name=self.shot_name, shot_date=self.date)
+
+    def _fileNameFilterString(self) ->str:
+        return (
+            "drawtext=fontsize={fontsize_small}:fontcolor=white:fontfile='C\\:/Windows/fonts/consola.ttf':text='{shot_file_name}':x={mask_padding}:y=h-(text_h/2)-(({mask_size}/3)*2)"
+        ).format(fontsize_small=self.fontsize_small, mask_size=self.mask_size, mask_padding=self.mask_padding, shot_file_name=os.path.basename(self.file_name))
+
+    def _framenumFilterString(self) ->str:
+        return (
+            "drawtext=fontsize={fontsize_large}:fontcolor=white:fontfile='C\\:/Windows/fonts/consola.ttf':text='%{{frame_num}}':start_number={start_frame}:x=w-text_w-{mask_padding}:y=h-(text_h/2)-({mask_size}/2)"
+        ).format(fontsize_large=self.fontsize_large, mask_size=self.mask_size, mask_padding=self.mask_padding, start_frame=self.in_frame)
+
+    def generateOverlayFilterString(self) ->str:
+        '''the static part of the clip mask (bars, logo and labels) on a transparent frame, the logo is input 0'''
+        logofilter=(
+            "[0:v]scale=h={mask_size}-{logopadding}:force_original_aspect_ratio=1[1];"
+            "[0][1]overlay=x={mask_padding}:y={logopadding}/2:format=rgb[0];[0]"
+        ).format(mask_size=self.mask_size, mask_padding=self.mask_padding, logopadding=self.mask_size/6) if self.logo_path else ""
+        return (
+            'color=c=black@0.0:s={width}x{height},format=rgba[0];'
+            '[0]drawbox=x=0:y=0:w=iw:h={mask_size}:color=black@{mask_opacity}:t=fill:replace=1[0];'
+            '[0]drawbox=x=0:y=ih-{mask_size}:w=iw:h={mask_size}:color=black@{mask_opacity}:t=fill:replace=1[0];'
+            '{logofilter}{statictext}[0];[0]{filename}'
+        ).format(width=self.scale[0], height=self.scale[1], mask_size=self.mask_size, mask_opacity=self.mask_opacity,
+                 logofilter=logofilter if logofilter else "[0]", statictext=self._staticTextFilterString(), filename=self._fileNameFilterString())
+
+    def renderOverlay(self, ffmpeg_bin: str, folder: str) ->str:
+        '''renders the static part of the mask once as a transparent png into folder and returns its path.
+        Masks with the same settings share the image. Returns an empty string if rendering failed.'''
+        key=hashCacheKey({
+            'filter': self.generateOverlayFilterString(),
+            'logo': fileIdentity(self.logo_path) if self.logo_path else None
+        })
+        overlay_path=os.path.join(folder, '{}.png'.format(key))
+        if os.path.isfile(overlay_path):
+            return overlay_path
+        os.makedirs(folder, exist_ok=True)
+        partial_path=os.path.join(folder, '{}.{}.partial.png'.format(key, threading.get_ident()))
+        job=FFmpegJob(
+            args=['-y', '-hide_banner', '-loglevel', 'error']
+                +(['-i', self.logo_path] if self.logo_path else [])
+                +['-filter_complex', self.generateOverlayFilterString(), '-frames:v', '1', partial_path],
+            output_path=partial_path,
+            name='{} overlay'.format(self.shot_name)
+        )
+        result=runFFmpeg(ffmpeg_bin, job)
+        if not result.success or not os.path.isfile(partial_path):
+            print('Could not render shotmask overlay for {}, drawing the full mask per frame\n{}'.format(self.shot_name, result.error))
+            return ''
+        os.replace(partial_path, overlay_path)
+        return overlay_path
+
+def framesToTimecode(frame: int, rate: float) ->str:
+    '''formats a frame number as an escaped hh:mm:ss:ff timecode for drawtext'''
+    rate=max(1, round(rate))
+    frame=int(round(frame))
+    return '{:02d}\\:{:02d}\\:{:02d}\\:{:02d}'.format(frame//(rate*3600), (frame//(rate*60))%60, (frame//rate)%60, frame%rate)
+
+def timecodeToFrames(timecode: str, rate: float) ->int:
+    '''the frame number of a timecode written by framesToTimecode'''
+    rate=max(1, round(rate))
+    hours, minutes, seconds, frames=(int(part) for part in timecode.replace('\\', '').split(':'))
+    return ((hours*60+minutes)*60+seconds)*rate+frames
+
+def relabelFilter(filter_string: str, suffix: str, streams: Dict[str, str]={}) ->str:
+    '''makes the link labels of a filter string unique, so it can be used as part of a larger graph.
+    Stream specifiers like 1:v are replaced by the labels in streams.'''
+    def relabel(match):
+        label=match.group(1)
+        if label in streams:
+            return '[{}]'.format(streams[label])
+        return '[{}_{}]'.format(label, suffix)
+    return re.sub(r'\[([^\[\]]+)\]', relabel, filter_string)
+
+
 @dataclass
 class Clip:
     config: Config
     in_frame: int
-    duration: float=0
+    duration: float=0 #in seconds, 0 takes the duration of the footage, see resolveDuration
     frame_handles_in: int=None
     clip_size: tuple=(1920,1080)
     pass_name: str=''
     name: str='S000'
-    shotmask: ShotMask = field(init=False)
-    fps: int= field(init=False)
+    source_in: float=None #in seconds, where the clip starts in its footage, None starts after the frame handles
+    encoding_profile: str='' #profile of the converted clip, empty uses the profile of the build
     is_converted: bool= field(init=False)
     is_missing_media: bool= field(init=False)
     converted_clip_path: str= field(init=False)
-    ready: bool= field(init=False)
+    convert_result: FFmpegResult= field(init=False)
     _clip_path: str = field(init=False)
+    # fps and ready are resolved from the footage on first use, None until then
+    _fps: float = field(init=False, repr=False)
+    _ready: bool = field(init=False, repr=False)
+    _shotmask: ShotMask = field(init=False, default=None, repr=False)
+    _mask_scale: tuple = field(init=False, default=None, repr=False)
 
     def __post_init__(self):
         _clip_path: str = ''
@@ -115,28 +1051,94 @@ class Clip:
         if not self.pass_name:
             self.pass_name=self.config.default_pass_name
         self._clip_path: Path=Path()
-        self.ready=False
+        self._fps=None
         self.converted_clip_path: Path=Path()
         self.is_missing_media=False
         self.is_converted=False
-        self.fps=self.getFrameRate() if os.path.isfile(self.clip_path) else self.config.fps
+        self.convert_result=None
         self.frame_handles_in=self.config.clip_frame_handles if not self.frame_handles_in else self.frame_handles_in
-        self.shotmask = ShotMask(
+        # the mask keeps the size the clip was created with
+        self._mask_scale=self.clip_size
+        self.clip_size=self.config.clip_size
+        self.check_ready()
+
+    @property
+    def fps(self) ->float:
+        if self._fps is None:
+            self._fps=self.getFrameRate() if os.path.isfile(self.clip_path) else self.config.fps
+        return self._fps
+
+    @fps.setter
+    def fps(self, fps: float):
+        self._fps=fps
+
+    def resolveDuration(self) ->float:
+        '''the duration in seconds, a duration of 0 is taken from the footage on first use and kept.
+        Resolving ready resolves the duration as well.'''
+        if not self.duration and os.path.isfile(self.clip_path):
+            self.duration=self.getDuration()
+        return self.duration
+
+    @property
+    def ready(self) ->bool:
+        if self._ready is None:
+            self._ready=self.clip_path.is_file() and self.fps>0 and self.resolveDuration()>0.0
+        return self._ready
+
+    @ready.setter
+    def ready(self, ready: bool):
+        self._ready=ready
+
+    def hasFootage(self) ->bool:
+        '''if footage was found for the clip, without probing it'''
+        return os.path.isfile(self.clip_path)
+
+    def outputSize(self) ->tuple:
+        '''the size the clip is converted to'''
+        return tuple(self._mask_scale)
+
+    def setOutputSize(self, size: tuple):
+        self._mask_scale=tuple(size)
+        self.clip_size=tuple(size)
+        if self._shotmask is not None:
+            self._shotmask.scale=tuple(size)
+
+    def sourceStart(self) ->float:
+        '''where the clip starts in its footage in seconds'''
+        if self.source_in is not None:
+            return self.source_in
+        return self.frame_handles_in/self.fps
+
+    @property
+    def shotmask(self) ->ShotMask:
+        # created on first use, so large edits only build the masks of the clips they convert
+        if self._shotmask is None:
+            self._shotmask=self.makeShotMask()
+        return self._shotmask
+
+    @shotmask.setter
+    def shotmask(self, shotmask: ShotMask):
+        self._shotmask=shotmask
+
+    def makeShotMask(self) ->ShotMask:
+        has_footage=os.path.isfile(self.clip_path)
+        shotmask = ShotMask(
             mode='clip',
             logo_path=self.config.shot_mask_logo_path,
-            scale=self.clip_size,
+            scale=self._mask_scale,
             fps=self.fps,
             pass_name=self.pass_name, 
             shot_name=self.name,
-            file_name=self.clip_path, 
-            in_frame=self.frame_handles_in,
+            file_name=os.path.basename(self.clip_path) if has_footage else self.clip_path, 
+            # the frame counter shows the frame of the footage
+            in_frame=self.frame_handles_in if self.source_in is None else round(self.source_in*self.fps),
             mask_opacity=0.2,
-            date=datetime.date.today().isoformat()
+            #this will set the time to the last clip mod time
+            date=datetime.datetime.fromtimestamp(Path(self.clip_path).stat().st_mtime).strftime('%Y-%m-%d') if has_footage else datetime.date.today().isoformat()
         )
         if not self.config.enable_shotmask:
-            self.shotmask.mode='resizeonly'
-        self.clip_size=self.config.clip_size
-        self.check_ready()
+            shotmask.mode='resizeonly'
+        return shotmask
     
     @property
     def clip_path(self):
@@ -146,35 +1148,52 @@ class Clip:
     def clip_path(self, footage_path):
         if os.path.isfile(footage_path):
             self._clip_path=footage_path
-            self.fps=self.getFrameRate()
-            self.shotmask.fps=self.fps
-            self.shotmask.file_name=os.path.basename(footage_path)
-            #this will set the time to the last clip mod time
-            self.shotmask.date=datetime.datetime.fromtimestamp(Path(footage_path).stat().st_mtime).strftime('%Y-%m-%d')
-            if self.duration==0:
-                self.duration=self.getDuration()
+            # probed when they are needed
+            self._fps=None
+            if self._shotmask is not None:
+                self._shotmask.fps=self.fps
+                self._shotmask.file_name=os.path.basename(footage_path)
+                #this will set the time to the last clip mod time
+                self._shotmask.date=datetime.datetime.fromtimestamp(Path(footage_path).stat().st_mtime).strftime('%Y-%m-%d')
             self.check_ready()
         else:
             print('Cannot set file {}, file does not exist.'.format(footage_path))
     
+    def setSequenceTimecode(self, frame: int, rate: float):
+        '''burns the edit timecode into the converted clip, frame is the position of the clip in the edit'''
+        self.shotmask.burn_timecode=True
+        self.shotmask.timecode=framesToTimecode(frame, rate)
+        self.shotmask.timecode_rate=rate
+
+    def clearSequenceTimecode(self):
+        '''the converted clip is drawn without the edit timecode again'''
+        if self._shotmask is not None:
+            self._shotmask.burn_timecode=False
+
     def get_pass_name(self) -> str:
         return self.pass_name
     
     def set_pass_name(self, pass_name: str):
-        self.shotmask.pass_name = pass_name
+        if self._shotmask is not None:
+            self._shotmask.pass_name = pass_name
         self.pass_name = pass_name
 
     def check_ready(self):
-        if (self.clip_path.is_file()) and self.fps>0 and self.duration>0.0:
-            self.ready=True
-        else:
-            self.ready=False
+        # resolved again on the next access
+        self._ready=None
 
     def check_converted(self):
         if (self.converted_clip_path.is_file()):
             self.is_converted=True
         else:
             self.is_converted=False
+
+    def resetFootage(self):
+        '''forgets the footage and the converted clip, the clip becomes missing media'''
+        self._clip_path=Path()
+        self.converted_clip_path=Path()
+        self.check_converted()
+        self.check_ready()
     
     @overload
     def findFootage(self, footage_source: str, latest: bool=True, durationFromClip=False):
@@ -182,53 +1201,55 @@ class Clip:
     @overload
     def findFootage(self, footage_source: Location, latest: bool=True, durationFromClip=False, location_filter=''):
         pass
+    @overload
+    def findFootage(self, footage_source: LocationIndex, latest: bool=True, durationFromClip=False):
+        pass
     
     def findFootage(self, footage_source, latest=True, durationFromClip=False, location_filter=''):
+        found=self.locateFootage(footage_source, latest=latest, location_filter=location_filter)
+        if not found:
+            if type(footage_source)!=Location:
+                print('Cannot find footage for {}'.format(self.name))
+                self.check_ready()
+            return None
+        latest_clip, sublocation_name=found
+        if sublocation_name is not None:
+            self.set_pass_name(sublocation_name)
+        
+        self.clip_path = latest_clip
+        if durationFromClip:
+            # taken from the new footage on first use
+            self.duration=0
+        self.check_ready()
+        self.is_missing_media=False
+        # print("Found {}".format(latest_clip))
+        return latest_clip
+
+    def locateFootage(self, footage_source, latest=True, location_filter='') ->Optional[tuple]:
+        '''returns the path of the footage for this clip and the name of the sublocation it was found in (None for folders),
+        without probing or changing the clip. Returns None if there is no footage.'''
         if type(footage_source)==Location:
             if location_filter=='':
                 latest_clip = footage_source.findLatestAllLocations(name=self.name, mime_type='video')
-                if latest_clip:
-                    self.set_pass_name(latest_clip['sublocation_name'])
-                    latest_clip=latest_clip['path']
-                    
-                else:
-                    return None
             else:
                 latest_clip=footage_source.findLatestInLocation(name=self.name, mime_type='video', location_name=location_filter)
-                if latest_clip:
-                    self.set_pass_name(latest_clip['sublocation_name'])
-                    latest_clip=latest_clip['path']
-                else:
-                    return None
+            if not latest_clip:
+                return None
+            return latest_clip['path'], latest_clip['sublocation_name']
             
-        elif type(footage_source)==str:
+        elif type(footage_source) in (str, LocationIndex):
             if latest:
                 # print('Searching Latest Clip footage for {} in {}'.format(self.name, footage_source))
-                searchpath = Path(footage_source)
-                videofiles_in_folder = [vf for vf in searchpath.rglob("*") if vf.is_file() and mimetypes.guess_type(vf)[0].startswith('video/')]
-                footageClips=[]
-                for file in videofiles_in_folder:
-                    #print(os.path.basename(str(file)))  
-                    if re.search("({})".format(self.name), os.path.basename(str(file)), flags=re.IGNORECASE):
-                        footageClips.append(file)
-                if len(footageClips)==0:
-                    print('Cannot find footage for {}'.format(self.name))
-                    self.check_ready()
+                if type(footage_source)==str:
+                    footage_source = LocationIndex(folder=footage_source, recursive=True)
+                latest_clip = footage_source.latest(self.name, mime_type='video')
+                if not latest_clip:
                     return None
-                
-                latest_clip = max(footageClips, key=lambda x: x.stat().st_mtime)
+                return latest_clip.path, None
             else:
                 raise NotImplementedError('Only latest clip mode is implemented. Set latest=True for this function')
         else:
             raise NotImplementedError('Footage Source Type {} not implemented'.format(type(footage_source)))
-        
-        self.clip_path = latest_clip
-        if durationFromClip:
-            self.duration=self.getDuration()
-        self.check_ready()
-        self.is_missing_media=False
-        # print("Found {}".format(latest_clip))
-        return latest_clip
 
     def generateMissingMediaFilter(self):
         color='Red'
@@ -251,112 +1272,358 @@ class Clip:
         missing_media_text="drawtext=fontsize={fontsize_title}:fontcolor=white:fontfile='C\\:/Windows/fonts/consola.ttf':text='{text}':x={x_ofs}:y={y_ofs}".format(
             fontsize_title=fontsize_title, text="Missing Media {}".format(self.name), x_ofs=text_offset_x, y_ofs=current_offset)
         
-        return '"{background}[0];[0]{missing_media_text}"'.format(
+        return '{background}[0];[0]{missing_media_text}'.format(
             background=background,
             missing_media_text=missing_media_text
         )
 
-    def convertClip(self, output_path:str, ffmpeg_bin:str='', out_fps: Any=None) ->bool: 
-        if not ffmpeg_bin:
-            ffmpeg_bin=self.config.ffmpeg_bin
+    def resolveOutFps(self, out_fps: Any=None):
         if not out_fps:
             out_fps=self.config.fps
         if type(out_fps)==str:
             if out_fps.lower()=='nochange':
                 out_fps=self.fps
+        return out_fps
+
+    def cacheKey(self, out_fps: Any=None, encode_settings: EncodeSettings=None) ->Optional[str]:
+        '''hash of the source file identity and all settings that affect the converted clip.
+        Missing media placeholders are keyed by their settings only, so they are reused as long as the clip is missing.
+        Returns None if the clip can't be cached.'''
         if not self.ready:
+            source=None
+        else:
+            source=fileIdentity(self.clip_path)
+            if not source:
+                return None
+        shotmask=asdict(self.shotmask)
+        shotmask['logo']=fileIdentity(self.shotmask.logo_path) if self.shotmask.logo_path else None
+        # the overlay is rendered from the other mask settings
+        shotmask.pop('overlay_path')
+        return hashCacheKey({
+            'version': CLIP_CACHE_VERSION,
+            'type': 'clip' if source else 'missing',
+            'name': None if source else self.name,
+            'source': source,
+            'shotmask': shotmask,
+            'trim': [self.frame_handles_in, self.duration, self.fps]+([self.source_in] if self.source_in is not None else []),
+            'out_fps': self.resolveOutFps(out_fps),
+            'clip_size': self.clip_size,
+            'encoder': asdict(encode_settings or self.config.getEncodingProfile().intermediate),
+            'ffmpeg': fileIdentity(self.config.ffmpeg_bin)
+        })
+
+    def makeConvertJob(self, output_path:str, ffmpeg_bin:str='', out_fps: Any=None, encode_settings: EncodeSettings=None, offset: float=0, duration: float=None) ->Optional[FFmpegJob]:
+        '''the ffmpeg job converting this clip, missing media is generated and masked in the same pass.
+        offset and duration (in seconds) convert only a part of the clip, the frame counter and timecode continue from offset.'''
+        if not ffmpeg_bin:
+            ffmpeg_bin=self.config.ffmpeg_bin
+        out_fps=self.resolveOutFps(out_fps)
+        if not encode_settings:
+            encode_settings=self.config.getEncodingProfile().intermediate
+        if duration is None:
+            duration=self.resolveDuration()
+        self.is_missing_media=not self.ready
+        if self.is_missing_media:
             print('Clip {} not ready, creating missing media clip!'.format(self.name))
-            missing_media_out_name=Path(Path(output_path).parent,"missingMedia_{}.mp4".format(self.name))
-            ffmpeg_cmd = (
-                "{ffmpeg_bin} -y -hide_banner -stats -loglevel error "
-                "-filter_complex {filter_string} "
-                "-t {duration} "
-                "-r {out_fps} "
-                "{output_name}"
-            ).format(
-                ffmpeg_bin=ffmpeg_bin, 
-                filter_string=self.generateMissingMediaFilter(), 
-                duration=str(datetime.timedelta(seconds=self.duration+(self.frame_handles_in/self.fps))),
-                out_fps=out_fps, 
-                output_name=missing_media_out_name
+            shotmask=replace(self.shotmask, file_name='Missing Media')
+        else:
+            shotmask=self.shotmask
+        if offset:
+            shotmask=replace(shotmask, in_frame=shotmask.in_frame+round(offset*self.fps))
+            if shotmask.burn_timecode:
+                shotmask.timecode=framesToTimecode(timecodeToFrames(shotmask.timecode, shotmask.timecode_rate)+round(offset*shotmask.timecode_rate), shotmask.timecode_rate)
+
+        if self.config.prerender_shotmask and shotmask.mode=='clip':
+            shotmask.overlay_path=shotmask.renderOverlay(ffmpeg_bin, os.path.join(self.config.cache_folder, 'overlays'))
+        mask_path=shotmask.overlay_path or shotmask.logo_path
+
+        if self.is_missing_media:
+            inputs=['-i', mask_path] if mask_path else []
+            filter_string='{missing_media}[missing];{shotmask}'.format(
+                missing_media=self.generateMissingMediaFilter(),
+                shotmask=relabelFilter(shotmask.generateFilterString(video_in='missing'), 'mask', {'1:v': '0:v', 'missing': 'missing'})
             )
-            subprocess.call(ffmpeg_cmd)
-
-            self.clip_path=Path(missing_media_out_name)
-            self.is_missing_media=True
-
-        if self.shotmask.logo_path:
-            ffmpeg_cmd = (
-                "{ffmpeg_bin} -y -hide_banner -stats -loglevel error "
-                "-ss {in_time} "
-                "-i {clip_path} "
-                "-i {logo_path} "
-                "-filter_complex {filter_string} "
-                "-t {duration} "
-                "-r {out_fps} "
-                "{output_name}"
-            ).format(
-                fps=self.fps,
-                in_time=str((self.frame_handles_in)/self.fps),
-                ffmpeg_bin=ffmpeg_bin, 
-                clip_path=self.clip_path, 
-                logo_path=self.shotmask.logo_path, 
-                filter_string=self.shotmask.generateFilterString(), 
-                duration=str(datetime.timedelta(seconds=self.duration)),
-                out_fps=out_fps, 
-                output_name=output_path
-                )
         else:
-            ffmpeg_cmd = (
-                "{ffmpeg_bin} -y -hide_banner -stats -loglevel error "
-                "-ss {in_time} "
-                "-i {clip_path} "
-                "-filter_complex {filter_string} "
-                "-t {duration} "
-                "-r {out_fps} "
-                "{output_name}"
-            ).format(
-                in_time=str(datetime.timedelta(seconds=self.frame_handles_in/self.fps)),
-                ffmpeg_bin=ffmpeg_bin, 
-                clip_path=self.clip_path, 
-                filter_string=self.shotmask.generateFilterString(), 
-                duration=str(datetime.timedelta(seconds=self.duration)),
-                out_fps=out_fps,
-                output_name=output_path)
-        
-        subprocess.call(ffmpeg_cmd)
-        
-        self.converted_clip_path=Path(output_path)
+            inputs=['-ss', str(self.sourceStart()+offset), '-i', str(self.clip_path)]
+            if mask_path:
+                inputs.extend(['-i', mask_path])
+            filter_string=shotmask.generateFilterString()
+
+        return FFmpegJob(
+            args=['-y', '-hide_banner', '-loglevel', 'error']
+                +inputs
+                +['-filter_complex', filter_string, '-t', str(duration), '-r', str(out_fps)]
+                +encode_settings.args()
+                +INTERMEDIATE_MUX_ARGS
+                +[str(output_path)],
+            output_path=str(output_path),
+            name=self.name,
+            timeout=self.config.ffmpeg_timeout,
+            frames=round(duration*float(out_fps))
+        )
+
+    def chunkRanges(self, out_fps: Any=None, chunk_length: float=None) ->List[tuple]:
+        '''splits the clip into parts of at least chunk_length seconds (defaults to config.chunk_length) as (offset, duration) in seconds.
+        Parts start at keyframes of the source, so each one is decoded from its own keyframe, and on frames of the output.
+        Clips shorter than twice chunk_length and missing media are a single part.'''
+        if chunk_length is None:
+            chunk_length=self.config.chunk_length
+        if not chunk_length or not self.ready or self.duration<chunk_length*2:
+            return [(0, self.duration)]
+        out_fps=float(self.resolveOutFps(out_fps))
+        start=self.sourceStart()
+        total_frames=round(self.duration*out_fps)
+        chunk_frames=chunk_length*out_fps
+        # without readable keyframes the parts are cut anywhere, seeking then decodes from the keyframe before
+        keyframes=self.config.getMediaProbe().keyframes(self.clip_path) or [start+chunk_length*i for i in range(1, int(self.duration/chunk_length))]
+        boundaries=[0]
+        for keyframe in keyframes:
+            frame=round((keyframe-start)*out_fps)
+            if frame-boundaries[-1]>=chunk_frames and total_frames-frame>=chunk_frames/2:
+                boundaries.append(frame)
+        boundaries.append(total_frames)
+        return [(first/out_fps, (last-first)/out_fps) for first, last in zip(boundaries, boundaries[1:])]
+
+    def copyRanges(self, out_fps: Any=None, encode_settings: EncodeSettings=None) ->Optional[List[tuple]]:
+        '''returns the part of the source to copy as [(offset, duration, True)] in seconds if the clip needs no processing:
+        no shotmask or timecode is drawn, the source already has the size, fps, codec and pixel format of the output
+        and the trim starts on a keyframe and ends on one or at the end of the source.
+        Returns None if the clip has to be converted.'''
+        if not self.ready or self.shotmask.mode!='resizeonly' or self.shotmask.burn_timecode:
+            return None
+        if not encode_settings:
+            encode_settings=self.config.getEncodingProfile().intermediate
+        info=self.getMediaInfo()
+        if not info or (info.width, info.height)!=tuple(self.shotmask.scale) or abs(info.fps-float(self.resolveOutFps(out_fps)))>0.001:
+            return None
+        if info.codec!=ENCODER_CODECS.get(encode_settings.codec, encode_settings.codec) or info.pix_fmt!=encode_settings.pix_fmt:
+            return None
+        # half a frame of tolerance for the rounding of the times
+        tolerance=0.5/self.fps
+        start=self.sourceStart()
+        end=start+self.duration
+        if info.duration<end-tolerance:
+            # the missing frames would be padded by the conversion
+            return None
+        # encoded edges joined to copied GOPs would need the exact h264 profile, level and parameter sets of the source,
+        # so a clip is only copied when both cuts are on keyframes and encoded completely otherwise
+        keyframes=self.config.getMediaProbe().keyframes(self.clip_path)
+        def onKeyframe(time):
+            return any(abs(keyframe-time)<=tolerance for keyframe in keyframes)
+        if not onKeyframe(start) or not (info.duration<=end+tolerance or onKeyframe(end)):
+            return None
+        return [(0, self.duration, True)]
+
+    def makeCopyJob(self, output_path:str, offset: float=0, duration: float=None) ->FFmpegJob:
+        '''the ffmpeg job copying a part of the source without re-encoding, offset has to be on a keyframe'''
+        if duration is None:
+            duration=self.duration
+        return FFmpegJob(
+            args=['-y', '-hide_banner', '-loglevel', 'error',
+                '-ss', str(self.sourceStart()+offset), '-i', str(self.clip_path),
+                '-t', str(duration), '-map', '0:v:0', '-c', 'copy', '-avoid_negative_ts', 'make_zero',
+                # the same timescale as converted clips, so the concat demuxer can join them
+                '-video_track_timescale', '90000',
+                str(output_path)],
+            output_path=str(output_path),
+            name='{} copy'.format(self.name),
+            timeout=self.config.ffmpeg_timeout,
+            frames=round(duration*self.fps)
+        )
+
+    def convertMethod(self, out_fps: Any=None, encode_settings: EncodeSettings=None) ->tuple:
+        '''how the clip is converted: ('copy', None) with a stream copy, ('chunked', ranges) in the parallel chunks of chunkRanges
+        or ('full', None) in a single job. convertClip, convertClipAsync and Edit.distributeClips all follow it.'''
+        # sources matching the output that are cut on keyframes are copied
+        if self.copyRanges(out_fps, encode_settings):
+            return 'copy', None
+        # long clips are converted in chunks in parallel if config.chunk_length is set
+        ranges=self.chunkRanges(out_fps)
+        if len(ranges)>1:
+            return 'chunked', ranges
+        return 'full', None
+
+    def makeChunkJobs(self, output_path:str, ranges: List[tuple], ffmpeg_bin:str='', out_fps: Any=None, encode_settings: EncodeSettings=None) ->Optional[List[FFmpegJob]]:
+        '''the jobs converting the ranges of chunkRanges into chunk files next to output_path, joined by makeJoinJob.
+        All chunks use the same encoder settings and start with a keyframe.'''
+        base_path=os.path.abspath(os.path.splitext(str(output_path))[0])
+        chunk_jobs=[]
+        # prepared one by one, so the shotmask overlay is rendered once
+        for i, (offset, duration) in enumerate(ranges):
+            chunk_path='{}.chunk{:03d}.mp4'.format(base_path, i)
+            job=self.makeConvertJob(chunk_path, ffmpeg_bin, out_fps, encode_settings, offset=offset, duration=duration)
+            if job is None:
+                return None
+            job.name='{} chunk {}/{}'.format(self.name, i+1, len(ranges))
+            chunk_jobs.append(job)
+        return chunk_jobs
+
+    def makeJoinJob(self, output_path:str, chunk_jobs: List[FFmpegJob]) ->FFmpegJob:
+        '''joins the converted chunks into output_path without re-encoding'''
+        list_path=self._chunkListPath(output_path)
+        with open(list_path, 'w') as list_file:
+            list_file.write(''.join("file '{}'\n".format(job.output_path.replace("'", "'\\''")) for job in chunk_jobs))
+        return FFmpegJob(
+            args=['-y', '-hide_banner', '-loglevel', 'error',
+                '-f', 'concat', '-safe', '0',
+                '-i', list_path,
+                '-c', 'copy', '-video_track_timescale', '90000',
+                str(output_path)],
+            output_path=str(output_path),
+            name='{} join'.format(self.name),
+            timeout=self.config.ffmpeg_timeout
+        )
+
+    def _chunkListPath(self, output_path:str) ->str:
+        return os.path.abspath(os.path.splitext(str(output_path))[0])+'.chunks.txt'
+
+    def finishChunks(self, results: List[FFmpegResult], joined: FFmpegResult, wall_time: float) ->bool:
+        '''like finishConvert for a clip converted in chunks, joined is None if a chunk failed'''
+        failures=[result for result in results if result is not None and not result.success]
+        if failures or joined is None:
+            return self.finishConvert(failures[0], 'chunked')
+        # the clip reports the frames of all chunks and the wall time from the first chunk to the joined clip
+        frames=sum(result.frames for result in results)
+        out_time=sum(result.out_time for result in results)
+        return self.finishConvert(replace(joined, name=self.name, wall_time=wall_time, frames=frames, out_time=out_time,
+            fps=frames/wall_time if wall_time>0 else 0, speed=out_time/wall_time if wall_time>0 else 0), 'chunked')
+
+    def removeChunks(self, output_path:str, chunk_jobs: List[FFmpegJob]):
+        for path in [job.output_path for job in chunk_jobs]+[self._chunkListPath(output_path)]:
+            if os.path.isfile(path):
+                os.remove(path)
+
+    def convertChunked(self, output_path:str, ranges: List[tuple], ffmpeg_bin:str='', out_fps: Any=None, encode_settings: EncodeSettings=None, jobs: int=None, on_progress=None, cancel_event: threading.Event=None) ->bool:
+        '''converts the ranges of chunkRanges with jobs (defaults to config.chunk_jobs, 0 uses all cpus) ffmpeg processes in parallel
+        and joins them with the concat demuxer without re-encoding.'''
+        if not ffmpeg_bin:
+            ffmpeg_bin=self.config.ffmpeg_bin
+        if jobs is None:
+            jobs=self.config.chunk_jobs
+        if not jobs or jobs<1:
+            jobs=os.cpu_count() or 1
+        start=time.perf_counter()
+        chunk_jobs=self.makeChunkJobs(output_path, ranges, ffmpeg_bin, out_fps, encode_settings)
+        if chunk_jobs is None:
+            return False
+
+        failed=threading.Event()
+        def run(job):
+            # chunks that did not start yet are skipped once one failed
+            if failed.is_set():
+                return None
+            result=runFFmpeg(ffmpeg_bin, job, on_progress=on_progress, cancel_event=cancel_event)
+            if not result.success:
+                failed.set()
+            return result
+
+        try:
+            with ThreadPoolExecutor(max_workers=min(jobs, len(chunk_jobs))) as pool:
+                results=list(pool.map(run, chunk_jobs))
+            if failed.is_set():
+                return self.finishChunks(results, None, 0)
+            joined=runFFmpeg(ffmpeg_bin, self.makeJoinJob(output_path, chunk_jobs), cancel_event=cancel_event)
+            return self.finishChunks(results, joined, time.perf_counter()-start)
+        finally:
+            self.removeChunks(output_path, chunk_jobs)
+
+    async def convertChunkedAsync(self, output_path:str, ranges: List[tuple], ffmpeg_bin:str='', out_fps: Any=None, encode_settings: EncodeSettings=None, jobs: int=None, on_progress=None, cancel_event: threading.Event=None) ->bool:
+        '''like convertChunked, but the chunks run as asyncio subprocesses'''
+        if not ffmpeg_bin:
+            ffmpeg_bin=self.config.ffmpeg_bin
+        if jobs is None:
+            jobs=self.config.chunk_jobs
+        if not jobs or jobs<1:
+            jobs=os.cpu_count() or 1
+        start=time.perf_counter()
+        chunk_jobs=await asyncio.to_thread(self.makeChunkJobs, output_path, ranges, ffmpeg_bin, out_fps, encode_settings)
+        if chunk_jobs is None:
+            return False
+
+        semaphore=asyncio.Semaphore(jobs)
+        failed=asyncio.Event()
+        async def run(job):
+            async with semaphore:
+                if failed.is_set():
+                    return None
+                result=await runFFmpegAsync(ffmpeg_bin, job, on_progress=on_progress, cancel_event=cancel_event)
+                if not result.success:
+                    failed.set()
+                return result
+
+        try:
+            results=await asyncio.gather(*[run(job) for job in chunk_jobs])
+            if failed.is_set():
+                return self.finishChunks(results, None, 0)
+            join_job=await asyncio.to_thread(self.makeJoinJob, output_path, chunk_jobs)
+            joined=await runFFmpegAsync(ffmpeg_bin, join_job, cancel_event=cancel_event)
+            return self.finishChunks(results, joined, time.perf_counter()-start)
+        finally:
+            self.removeChunks(output_path, chunk_jobs)
+
+    def finishConvert(self, result: FFmpegResult, method: str='full') ->bool:
+        '''marks the clip as converted if the job succeeded, a failed output is removed so it never ends up in an edit.
+        method is how the clip was converted, it is kept on convert_result.'''
+        self.convert_result=result=replace(result, method=method)
+        if reportResult(result) and os.path.isfile(result.output_path):
+            self.converted_clip_path=Path(result.output_path)
+        else:
+            if result.output_path and os.path.isfile(result.output_path):
+                os.remove(result.output_path)
+            self.converted_clip_path=Path()
         self.check_converted()
-        return True
+        return self.is_converted
+
+    def convertClip(self, output_path:str, ffmpeg_bin:str='', out_fps: Any=None, encode_settings: EncodeSettings=None, on_progress=None, cancel_event: threading.Event=None, chunk_jobs: int=None) ->bool: 
+        '''converts the clip to output_path, see convertMethod. chunk_jobs is the number of chunks converted in parallel, see convertChunked.'''
+        if not ffmpeg_bin:
+            ffmpeg_bin=self.config.ffmpeg_bin
+        method, ranges=self.convertMethod(out_fps, encode_settings)
+        if method=='copy':
+            return self.finishConvert(runFFmpeg(ffmpeg_bin, self.makeCopyJob(output_path), on_progress=on_progress, cancel_event=cancel_event), 'copy')
+        if method=='chunked':
+            return self.convertChunked(output_path, ranges, ffmpeg_bin, out_fps, encode_settings, jobs=chunk_jobs, on_progress=on_progress, cancel_event=cancel_event)
+        job=self.makeConvertJob(output_path, ffmpeg_bin, out_fps, encode_settings)
+        if job is None:
+            return False
+        return self.finishConvert(runFFmpeg(ffmpeg_bin, job, on_progress=on_progress, cancel_event=cancel_event))
+
+    async def convertClipAsync(self, output_path:str, ffmpeg_bin:str='', out_fps: Any=None, encode_settings: EncodeSettings=None, on_progress=None, cancel_event: threading.Event=None, chunk_jobs: int=None) ->bool:
+        '''like convertClip, but ffmpeg runs as asyncio subprocess.
+        The job is prepared on a thread, as it may probe the keyframes or render the shotmask overlay.'''
+        if not ffmpeg_bin:
+            ffmpeg_bin=self.config.ffmpeg_bin
+        method, ranges=await asyncio.to_thread(self.convertMethod, out_fps, encode_settings)
+        if method=='copy':
+            return self.finishConvert(await runFFmpegAsync(ffmpeg_bin, self.makeCopyJob(output_path), on_progress=on_progress, cancel_event=cancel_event), 'copy')
+        if method=='chunked':
+            return await self.convertChunkedAsync(output_path, ranges, ffmpeg_bin, out_fps, encode_settings, jobs=chunk_jobs, on_progress=on_progress, cancel_event=cancel_event)
+        job=await asyncio.to_thread(self.makeConvertJob, output_path, ffmpeg_bin, out_fps, encode_settings)
+        if job is None:
+            return False
+        return self.finishConvert(await runFFmpegAsync(ffmpeg_bin, job, on_progress=on_progress, cancel_event=cancel_event))
     
-    def getFrameRate(self, ffprobe_bin:str=''):
-        if not ffprobe_bin:
-            ffprobe_bin=self.config.ffprobe_bin
+    def getMediaInfo(self, ffprobe_bin:str='') ->Optional[MediaInfo]:
         if not os.path.exists(self.clip_path):
             sys.stderr.write("ERROR: filename %r was not found!" % (self.clip_path,))
+            return None
+        return self.config.getMediaProbe(ffprobe_bin).probe(self.clip_path)
+
+    def getFrameRate(self, ffprobe_bin:str=''):
+        info = self.getMediaInfo(ffprobe_bin)
+        if not info:
             return -1
-        try:
-            out = subprocess.check_output([ffprobe_bin,str(self.clip_path),"-v","0","-select_streams","v","-print_format","flat","-show_entries","stream=r_frame_rate"], text=True)
-            rate = out.split('=')[1].strip()[1:-1].split('/')
-            if len(rate)==1:
-                return float(rate[0])
-            if len(rate)==2:
-                return float(rate[0])/float(rate[1])
-            return -1
-        # when no clip does exist, it can't be checked for its fps and we need to use the base
-        except TypeError as e:
-            print("Error when getting frame rate, using base fps\n{}".format(e))
-            return self.fps
+        # when the clip has no readable rate, it can't be checked for its fps and we need to use the base
+        if info.fps<=0:
+            print("Error when getting frame rate, using base fps")
+            return self.config.fps
+        return info.fps
 
     def getDuration(self, ffprobe_bin:str=''):
-        if not ffprobe_bin:
-            ffprobe_bin=self.config.ffprobe_bin
-        if not os.path.exists(self.clip_path):
-            sys.stderr.write("ERROR: filename %r was not found!" % (self.clip_path,))
-            return -1   
-        out = subprocess.check_output([ffprobe_bin,str(self.clip_path),"-v", "error","-select_streams","v","-print_format","flat","-show_entries","stream=duration"],text=True)
-        duration = float(out.split('=')[1].strip()[1:-1])
+        info = self.getMediaInfo(ffprobe_bin)
+        if not info:
+            return -1
+        duration = info.duration
         handle_duration= (self.frame_handles_in*2)/self.fps
         duration -= handle_duration
         return duration
@@ -381,54 +1648,90 @@ class Slate(Clip):
         self.ready=False
         self.converted_clip_path: Path=Path()
         self.is_converted=False
+        self.convert_result=None
         self.fps=self.config.fps
         self.frame_handles_in=0
         self.shotmask = None
         self.clip_size=self.config.clip_size
         self.is_missing_media=False
+        self.timecode=None
+        self.timecode_rate=self.fps
         self.check_ready()
 
+    def setSequenceTimecode(self, frame: int, rate: float):
+        self.timecode=framesToTimecode(frame, rate)
+        self.timecode_rate=rate
+
+    def clearSequenceTimecode(self):
+        self.timecode=None
+
+    def resolveDuration(self) ->float:
+        # slates have no footage to take a duration from
+        return self.duration
+
     def check_ready(self):
         if self.title and self.duration>0:
             self.ready = True
         else:
             self.ready = False
     
-    def convertClip(self, output_path:str, ffmpeg_bin:str='', out_fps: Any=None) ->bool: 
-        if not ffmpeg_bin:
-            ffmpeg_bin=self.config.ffmpeg_bin
-        if not out_fps:
-            out_fps=self.config.fps
-        if type(out_fps)==str:
-            if out_fps.lower()=='nochange':
-                out_fps=self.fps
+    def cacheKey(self, out_fps: Any=None, encode_settings: EncodeSettings=None) ->Optional[str]:
+        # the filter string holds title, notes, size, fps and the date, so a slate is rendered again at most once a day
         if not self.ready:
-            print('Slate {} not ready, skipping conversion!'.format(self.title))
-            return False
-        ffmpeg_cmd = (
-            "{ffmpeg_bin} -y -hide_banner -stats -loglevel error "
-            "-i {logo_path} "
-            "-filter_complex {filter_string} "
-            "-t {duration} "
-            "-r {out_fps} "
-            "{output_name}"
-        ).format(
-            fps=self.fps,
-            ffmpeg_bin=ffmpeg_bin, 
-            logo_path=self.config.shot_mask_logo_path, 
-            filter_string=self.generateFilterString(), 
-            duration=str(datetime.timedelta(seconds=self.duration)),
-            out_fps=out_fps, 
-            output_name=output_path
-            )
-
-        subprocess.call(ffmpeg_cmd)
-        
-        self.converted_clip_path=Path(output_path)
-        self.check_converted()
-        print(f"Generated Slate at {output_path}")
+            return None
+        return hashCacheKey({
+            'version': CLIP_CACHE_VERSION,
+            'type': 'slate',
+            'filter': self.generateFilterString(),
+            'logo': fileIdentity(self.config.shot_mask_logo_path) if self.config.shot_mask_logo_path else None,
+            'duration': self.duration,
+            'out_fps': self.resolveOutFps(out_fps),
+            'encoder': asdict(encode_settings or self.config.getEncodingProfile().intermediate),
+            'ffmpeg': fileIdentity(self.config.ffmpeg_bin)
+        })
+
+    def makeShotMask(self) ->ShotMask:
+        return None
+
+    def hasFootage(self) ->bool:
+        # slates are generated
         return True
 
+    def outputSize(self) ->tuple:
+        return tuple(self.clip_size)
+
+    def setOutputSize(self, size: tuple):
+        self.clip_size=tuple(size)
+
+    def chunkRanges(self, out_fps: Any=None, chunk_length: float=None) ->List[tuple]:
+        # slates are generated and short
+        return [(0, self.duration)]
+
+    def copyRanges(self, out_fps: Any=None, encode_settings: EncodeSettings=None) ->Optional[List[tuple]]:
+        return None
+
+    def makeConvertJob(self, output_path:str, ffmpeg_bin:str='', out_fps: Any=None, encode_settings: EncodeSettings=None) ->Optional[FFmpegJob]:
+        out_fps=self.resolveOutFps(out_fps)
+        if not encode_settings:
+            encode_settings=self.config.getEncodingProfile().intermediate
+        if not self.ready:
+            print('Slate {} not ready, skipping conversion!'.format(self.title))
+            return None
+        return FFmpegJob(
+            args=['-y', '-hide_banner', '-loglevel', 'error',
+                '-i', self.config.shot_mask_logo_path,
+                '-filter_complex', self.generateFilterString(),
+                '-t', str(self.duration),
+                '-r', str(out_fps)]
+                +encode_settings.args()
+                +INTERMEDIATE_MUX_ARGS
+                +[str(output_path)],
+            output_path=str(output_path),
+            name=self.name,
+            timeout=self.config.ffmpeg_timeout,
+            frames=round(self.duration*float(out_fps))
+        )
+
     def generateFilterString(self):
         color='Black'
         grid_ratio=self.clip_size[1]/5
@@ -483,7 +1786,12 @@ class Slate(Clip):
             y_ofs=self.clip_size[1]-(grid_ratio/2)
         )
 
-        return '"{background}[2];{logofilter}[1];[2][1]{logooverlay}[0];[0]{title}[0];[0]{date}[0];[0]{subtitle}[0];[0]{countdown_text}[0];[0]{notes}"'.format(
+        timecode_text=(
+            "[0]fps={rate}[0];"
+            "[0]drawtext=fontsize=16:fontcolor=white:fontfile='C\\:/Windows/fonts/consola.ttf':timecode='{timecode}':rate={rate}:x=(w-text_w)/2:y=h-(text_h/2)-(60/2)"
+        ).format(rate=self.timecode_rate, timecode=self.timecode) if self.timecode else ""
+
+        return '{background}[2];{logofilter}[1];[2][1]{logooverlay}[0];[0]{title}[0];[0]{date}[0];[0]{subtitle}[0];[0]{countdown_text}[0];[0]{notes}{timecode_text}'.format(
             background=background, 
             logofilter=logofilter, 
             logooverlay=logooverlay,
@@ -491,13 +1799,167 @@ class Slate(Clip):
             date=date,
             subtitle=subtitle,
             countdown_text=countdown_text,
-            notes=notes
+            notes=notes,
+            timecode_text="[0];"+timecode_text if timecode_text else ""
             )
 
     def findFootage(self, footage_source: str, latest: bool=True, durationFromClip=False, location_filter=''):
         pass # print('Slates currently do not support footage')
         self.check_ready()
 
+    def locateFootage(self, footage_source, latest=True, location_filter='') ->Optional[tuple]:
+        return None
+
+@dataclass
+class IndexEntry:
+    path: Path
+    name: str
+    match_path: str #lowercase path relative to the indexed folder, used for name matching
+    mtime: float
+    size: int
+    mime_type: str
+
+@dataclass
+class LocationIndex:
+    '''all files of a folder, scanned once with os.scandir.
+    subfolders_only only indexes files one folder down, recursive indexes the whole tree.
+    Names are matched case insensitive against the path relative to the folder,
+    results are memoized so resolving a name a second time is a dictionary lookup.'''
+    folder: str
+    subfolders_only: bool=False
+    recursive: bool=False
+    entries: Dict[str, IndexEntry]=field(init=False, repr=False)
+    _tokens: Dict[str, List[IndexEntry]]=field(init=False, repr=False)
+    _matches: Dict[str, List[IndexEntry]]=field(init=False, repr=False)
+    _lock: threading.RLock=field(init=False, repr=False)
+
+    token_separators = re.compile(r'[\\/_.\s]+')
+
+    def __post_init__(self):
+        self._lock=threading.RLock()
+        self.scan()
+
+    def scan(self):
+        with self._lock:
+            self.entries={}
+            self._tokens={}
+            self._matches={}
+            if self.recursive:
+                self._scanFolder(self.folder, recursive=True)
+            elif self.subfolders_only:
+                for folder in self._listFolders(self.folder):
+                    self._scanFolder(folder)
+            else:
+                self._scanFolder(self.folder)
+
+    def _listFolders(self, folder: str) ->List[str]:
+        try:
+            with os.scandir(folder) as scan:
+                return [entry.path for entry in scan if entry.is_dir()]
+        except OSError:
+            return []
+
+    def _scanFolder(self, folder: str, recursive: bool=False):
+        try:
+            with os.scandir(folder) as scan:
+                for entry in scan:
+                    if entry.is_file():
+                        self._add(entry.path, entry.stat())
+                    elif recursive and entry.is_dir():
+                        self._scanFolder(entry.path, recursive=True)
+        except OSError as e:
+            print('Cannot scan folder {}\n{}'.format(folder, e))
+
+    def _add(self, path: str, stat: os.stat_result):
+        match_path=os.path.relpath(path, self.folder).lower()
+        index_entry=IndexEntry(
+            path=Path(path),
+            name=os.path.basename(path),
+            match_path=match_path,
+            mtime=stat.st_mtime,
+            size=stat.st_size,
+            mime_type=mimetypes.guess_type(path)[0] or ''
+        )
+        self.entries[path]=index_entry
+        for token in set(self.token_separators.split(match_path)):
+            self._tokens.setdefault(token, []).append(index_entry)
+
+    def addFile(self, path: str) ->Optional[IndexEntry]:
+        '''adds or updates a single file without rescanning the folder'''
+        path=str(path)
+        with self._lock:
+            self.removeFile(path)
+            try:
+                self._add(path, os.stat(path))
+            except OSError:
+                return None
+            self._matches={}
+            return self.entries[path]
+
+    def removeFile(self, path: str):
+        path=str(path)
+        with self._lock:
+            index_entry=self.entries.pop(path, None)
+            if index_entry is None:
+                return
+            for token in set(self.token_separators.split(index_entry.match_path)):
+                self._tokens[token].remove(index_entry)
+                if not self._tokens[token]:
+                    del self._tokens[token]
+            self._matches={}
+
+    def covers(self, path: str) ->bool:
+        '''if path belongs into this index, whether or not it exists'''
+        relative_path=os.path.relpath(os.path.abspath(str(path)), os.path.abspath(self.folder))
+        if relative_path.startswith('..') or os.path.isabs(relative_path):
+            return False
+        depth=len(Path(relative_path).parts)
+        if self.recursive:
+            return True
+        return depth==(2 if self.subfolders_only else 1)
+
+    def updateFile(self, path: str) ->bool:
+        '''adds, updates or removes path depending on whether it exists, returns False if path is not part of this index'''
+        if not self.covers(path):
+            return False
+        if os.path.isfile(path):
+            self.addFile(path)
+        else:
+            self.removeFile(path)
+        return True
+
+    def find(self, name: str, glob_filter: str='*', mime_type: str='') ->List[IndexEntry]:
+        '''all files containing name, sorted by modification time'''
+        key=name.lower()
+        with self._lock:
+            matches=self._matches.get(key)
+            if matches is None:
+                if self.token_separators.search(key):
+                    candidates=self.entries.values()
+                else:
+                    # only the distinct path tokens need to be compared, not every file
+                    candidates={id(e): e for token, token_entries in self._tokens.items() if key in token for e in token_entries}.values()
+                matches=sorted([e for e in candidates if key in e.match_path], key=lambda e: e.mtime)
+                self._matches[key]=matches
+        if glob_filter and glob_filter!='*':
+            matches=[e for e in matches if fnmatch.fnmatch(e.name, glob_filter)]
+        if mime_type:
+            matches=[e for e in matches if e.mime_type.startswith('{}/'.format(mime_type))]
+        return matches
+
+    def latest(self, name: str, glob_filter: str='*', mime_type: str='') ->Optional[IndexEntry]:
+        matches=self.find(name, glob_filter, mime_type)
+        return matches[-1] if matches else None
+
+    def files(self, glob_filter: str='*', mime_type: str='') ->List[IndexEntry]:
+        with self._lock:
+            files=sorted(self.entries.values(), key=lambda e: e.mtime)
+        if glob_filter and glob_filter!='*':
+            files=[e for e in files if fnmatch.fnmatch(e.name, glob_filter)]
+        if mime_type:
+            files=[e for e in files if e.mime_type.startswith('{}/'.format(mime_type))]
+        return files
+
 @dataclass
 class Location():
     name: str
@@ -507,9 +1969,11 @@ class Location():
     location_type: str='local'
     subfolders_only: Bool=False
     sub_locations: List[Location]=field(init=False)
+    index: LocationIndex=field(init=False, repr=False)
 
     def __post_init__(self):
         self.sub_locations=[]
+        self.index=None
 
     def __str__(self):
         return '<editbot_main.Location>{}'.format(self.folder)
@@ -524,22 +1988,47 @@ class Location():
         self.sub_locations.append(location)
         self.sub_locations.sort(key=lambda i: i.priority, reverse=True)
 
+    def allLocations(self) ->List[Location]:
+        locations=[self]
+        for sub_location in self.sub_locations:
+            locations.extend(sub_location.allLocations())
+        return locations
+
+    def buildIndex(self, refresh: bool=False, jobs: int=8):
+        '''scans this location and all sublocations in parallel, each folder is only read once.
+        The index is kept until refresh is set or invalidateIndex is called.'''
+        locations=[l for l in self.allLocations() if refresh or l.index is None]
+        if not locations:
+            return
+        def scan(location):
+            location.index=LocationIndex(folder=location.path, subfolders_only=location.subfolders_only)
+        if len(locations)==1 or jobs<=1:
+            [scan(l) for l in locations]
+        else:
+            with ThreadPoolExecutor(max_workers=min(jobs, len(locations))) as pool:
+                list(pool.map(scan, locations))
+
+    def invalidateIndex(self):
+        for location in self.allLocations():
+            location.index=None
+
+    def getIndex(self) ->LocationIndex:
+        if self.index is None:
+            self.buildIndex()
+        return self.index
+
+    def updateFile(self, path: str) ->List[Location]:
+        '''updates a new, changed or removed file in the indexes of all locations it belongs to, without rescanning.
+        Returns these locations.'''
+        return [location for location in self.allLocations() if location.getIndex().updateFile(path)]
+
     def getFilesDict(self, glob_filter: str='*', mime_type: str= '') ->Dict:
         # files are always sorted by latest per sublocation
         # sublocation are always sorted by priority
         files = {}
         files[self.name] = {}
         files[self.name]['path'] = self.path
-        if not self.subfolders_only:
-            file_list = [Path(f) for f in glob.glob(r'{}\{}'.format(self.path,glob_filter)) if os.path.isfile(f)]
-            if mime_type:
-                file_list = [vf for vf in file_list if mimetypes.guess_type(vf)[0].startswith('{}/'.format(mime_type))]
-            files[self.name]['files'] = sorted(file_list, key= lambda x: x.stat().st_mtime)
-        else:
-            file_list = [Path(f) for f in glob.glob(r'{}\*\{}'.format(self.path,glob_filter)) if os.path.isfile(f)]
-            if mime_type:
-                file_list = [vf for vf in file_list if mimetypes.guess_type(vf)[0].startswith('{}/'.format(mime_type))]
-            files[self.name]['files'] = sorted(file_list, key= lambda x: x.stat().st_mtime)
+        files[self.name]['files'] = [e.path for e in self.getIndex().files(glob_filter, mime_type)]
         if len(self.sub_locations)>0:
             files[self.name]['sublocations']=[]
             for sub_location in self.sub_locations:
@@ -548,16 +2037,10 @@ class Location():
     
     def getFiles(self, glob_filter: str='*', mime_type: str= '', include_sublocations=True) ->List[Path]:
         # files are always sorted by priority first and latest second
-        files = []
-        if not self.subfolders_only:
-            files.extend(sorted([Path(f) for f in glob.glob(r'{}\{}'.format(self.path,glob_filter)) if os.path.isfile(f)], key=lambda x: x.stat().st_mtime))
-        else:
-            files.extend(sorted([Path(f) for f in glob.glob(r'{}\*\{}'.format(self.path,glob_filter)) if os.path.isfile(f)], key=lambda x: x.stat().st_mtime))
+        files = [e.path for e in self.getIndex().files(glob_filter, mime_type)]
         if len(self.sub_locations)>0 and include_sublocations:
             for sub_location in self.sub_locations:
                 files.extend(sub_location.getFiles(glob_filter=glob_filter, mime_type=mime_type))
-        if mime_type:
-            files = [vf for vf in files if mimetypes.guess_type(vf)[0].startswith('{}/'.format(mime_type))]
         return files
 
     @overload
@@ -572,15 +2055,11 @@ class Location():
         if len(self.sub_locations)>0:
             for sublocation in self.sub_locations:
                 files.extend(sublocation.findLatestInLocation(name, glob_filter, mime_type))
-        found_files = []
-        for file in self.getFiles(glob_filter, mime_type, include_sublocations=False):
-            if re.search("({})".format(name), str(file), flags=re.IGNORECASE):
-                found_files.extend(file if type(file)==List else [file])
-        if found_files: 
-            latest_file = max(found_files, key=lambda x: x.stat().st_mtime)
+        latest_file = self.getIndex().latest(name, glob_filter, mime_type)
+        if latest_file: 
             found_file={
                 'name': name,
-                'path': latest_file,
+                'path': latest_file.path,
                 'sublocation_name': self.name,
                 'priority': self.priority
             }
@@ -595,6 +2074,465 @@ class Location():
         latestInLocation = self.findLatestInLocation(name, glob_filter, mime_type)
         return latestInLocation[0] if len(latestInLocation)>0 else None
 
+def parseTimecode(timecode: str, rate: float) ->int:
+    '''the frame number of a hh:mm:ss:ff timecode, timecodes with ; are drop frame'''
+    rate_int=max(1, round(rate))
+    hours, minutes, seconds, frames=(int(part) for part in re.split('[:;.]', timecode.strip()))
+    frame=((hours*60+minutes)*60+seconds)*rate_int+frames
+    if ';' in timecode:
+        # two frame numbers (four at 60fps) are skipped every minute, except every tenth minute
+        total_minutes=hours*60+minutes
+        frame-=round(rate_int/15)*(total_minutes-total_minutes//10)
+    return frame
+
+def shotName(clip_name: str, name_pattern: str='') ->str:
+    '''the shot name for a clip name of an edit list. Without a pattern it is the clip name without extension,
+    a regular expression takes its first group or the whole match, so name_pattern=r'S\d+' turns S010_v002.mov into S010.'''
+    name=os.path.splitext(os.path.basename(clip_name.strip()))[0]
+    if name_pattern:
+        match=re.search(name_pattern, name)
+        if match:
+            return match.group(1) if match.groups() else match.group(0)
+    return name
+
+EDL_EVENT = re.compile(r'^(\d+)\s+(\S+)\s+(\S+)\s+(\S+)(?:\s+(\d+))?\s+(\d\d[:;.]\d\d[:;.]\d\d[:;.]\d\d)\s+(\d\d[:;.]\d\d[:;.]\d\d[:;.]\d\d)\s+(\d\d[:;.]\d\d[:;.]\d\d[:;.]\d\d)\s+(\d\d[:;.]\d\d[:;.]\d\d[:;.]\d\d)')
+
+def readEDL(path: str, rate: float, name_pattern: str='', source_start: str='00:00:00:00'):
+    '''reads the video events of a CMX3600 edl line by line and yields them as shots like in minimal_edit.json,
+    with sourceIn (seconds into the footage) from the source timecode minus source_start.
+    The shot name comes from the FROM CLIP NAME comment of the event (TO CLIP NAME for dissolves and wipes) or its reel, see shotName.
+    Events without record duration, like the outgoing half of a dissolve, are skipped.'''
+    source_offset=parseTimecode(source_start, rate)
+    shot=None
+    name_comment='FROM CLIP NAME:'
+    with open(path, 'r', errors='replace') as edl:
+        for line in edl:
+            match=EDL_EVENT.match(line.strip())
+            if match:
+                if shot:
+                    yield shot
+                event, reel, track, transition, transition_frames, src_in, src_out, rec_in, rec_out=match.groups()
+                if 'V' not in track.upper():
+                    shot=None
+                    continue
+                record_in=parseTimecode(rec_in, rate)
+                record_out=parseTimecode(rec_out, rate)
+                if record_out<=record_in:
+                    shot=None
+                    continue
+                shot={
+                    'name': shotName(reel, name_pattern),
+                    'startFrame': record_in,
+                    'durationSeconds': (record_out-record_in)/rate,
+                    'sourceIn': max(0, parseTimecode(src_in, rate)-source_offset)/rate
+                }
+                # the FROM clip of a transition is the outgoing one
+                name_comment='FROM CLIP NAME:' if transition.upper()=='C' else 'TO CLIP NAME:'
+            elif shot and line.startswith('*') and name_comment in line.upper():
+                shot['name']=shotName(line.split(':', 1)[1], name_pattern)
+        if shot:
+            yield shot
+
+def readOTIO(path: str, rate: float, name_pattern: str='', track: int=0):
+    '''yields the clips of a video track of an OpenTimelineIO file as shots like in minimal_edit.json,
+    with sourceIn relative to the start of the media. Needs the opentimelineio package,
+    which always reads the whole timeline, use edl or json lines files for very large edits.'''
+    try:
+        import opentimelineio as otio
+    except ImportError:
+        raise ImportError('Reading {} needs the opentimelineio package, install it with pip install opentimelineio'.format(path))
+    timeline=otio.adapters.read_from_file(str(path))
+    for item in timeline.video_tracks()[track]:
+        if not isinstance(item, otio.schema.Clip):
+            continue
+        record=item.range_in_parent()
+        source=item.trimmed_range()
+        media_start=0
+        available_range=getattr(item.media_reference, 'available_range', None)
+        if available_range is not None:
+            media_start=available_range.start_time.to_seconds()
+        media_name=getattr(item.media_reference, 'target_url', '') or item.name
+        yield {
+            'name': shotName(item.name or media_name, name_pattern),
+            'startFrame': round(record.start_time.rescaled_to(rate).value),
+            'durationSeconds': source.duration.to_seconds(),
+            'sourceIn': max(0, source.start_time.to_seconds()-media_start)
+        }
+
+def readEditJsonl(path: str):
+    '''yields the shots of a json lines file, one shot like in minimal_edit.json per line'''
+    with open(path, 'r') as shot_desc:
+        for line in shot_desc:
+            if line.strip():
+                yield json.loads(line)
+
+def readEditFile(path: str, rate: float, name_pattern: str='', source_start: str='00:00:00:00'):
+    '''reads shots from a .json (minimal_edit.json), .jsonl, .edl or .otio file.
+    source_start is the timecode the footage of an edl starts at, see readEDL.'''
+    extension=os.path.splitext(str(path))[1].lower()
+    if extension=='.edl':
+        return readEDL(path, rate, name_pattern=name_pattern, source_start=source_start)
+    if extension=='.otio':
+        return readOTIO(path, rate, name_pattern=name_pattern)
+    if extension=='.jsonl':
+        return readEditJsonl(path)
+    with open(path, 'r') as shot_desc:
+        return json.load(shot_desc)
+
+@dataclass
+class BuildEvent:
+    '''a timed stage of an edit build, passed to every hook of the edit.
+    stage is one of discovery, probe, convert, preconvert, concat, build, graph, audio or cleanup.
+    encoder and pixels of convert, concat, build and graph events are kept as throughput history, see ThroughputHistory.'''
+    stage: str
+    name: str
+    start: float #unix time
+    duration: float #in seconds
+    frames: int=0 #frames encoded
+    bytes_written: int=0
+    cache_hits: int=0
+    cache_misses: int=0
+    success: bool=True
+    encoder: str='' #label of the encode settings, copy for stream copies, empty if nothing was encoded
+    pixels: int=0 #frames encoded times their width and height
+
+def escapeLabel(value: str) ->str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+# rough pixels per second of a single x264 job by preset, only used for settings that were never measured
+DEFAULT_THROUGHPUT = {
+    'ultrafast': 400e6,
+    'superfast': 300e6,
+    'veryfast': 200e6,
+    'faster': 130e6,
+    'fast': 90e6,
+    'medium': 60e6,
+    'slow': 30e6,
+    'slower': 15e6,
+    'veryslow': 6e6,
+}
+# stream copies and joins run at disk speed
+DEFAULT_COPY_THROUGHPUT = 5e9
+
+def defaultBytesPerPixel(encode_settings: EncodeSettings) ->float:
+    # about x264 at crf 23, the size halves every 6 crf and all intra clips are several times larger
+    crf=encode_settings.crf if encode_settings.crf is not None else 23
+    return 0.01*2**((23-crf)/6)*(5 if encode_settings.gop==1 else 1)
+
+@dataclass
+class ThroughputHistory:
+    '''measured pixels per second and bytes per pixel of earlier builds, per stage and encode settings.
+    Read from timing reports (.timing.json), benchmark results and the history each build records in the cache folder.
+    Settings that were never measured are estimated from rough defaults.'''
+    max_samples: int=20 #only the latest runs count, so the estimates follow hardware and version changes
+    samples: Dict[tuple, collections.deque]=field(default_factory=dict)
+
+    def add(self, stage: str, encoder: str, pixels: int, seconds: float, bytes_written: int=0):
+        if pixels<=0 or seconds<=0:
+            return
+        self.samples.setdefault((stage, encoder), collections.deque(maxlen=self.max_samples)).append((pixels, seconds, bytes_written))
+
+    def addEvents(self, events: list):
+        '''adds BuildEvents, or their dicts from a timing report'''
+        for event in events:
+            if not isinstance(event, dict):
+                event=asdict(event)
+            if event.get('success', True) and event.get('encoder'):
+                self.add(event['stage'], event['encoder'], event.get('pixels', 0), event['duration'], event.get('bytes_written', 0))
+
+    def addBenchmarkResult(self, result: Dict, encoding_profiles: Dict[str, EncodingProfile]):
+        # benchmarks render one profile at one size, their clips are all encoded
+        profile=encoding_profiles.get(result.get('profile'))
+        if not profile or not result.get('size'):
+            return
+        width, height=result['size']
+        for stage, encode_settings in (('convert', profile.intermediate), ('build', profile.final)):
+            values=result.get('stages', {}).get(stage)
+            if values and not values.get('failed'):
+                self.add(stage, encode_settings.label(), values['frames']*width*height, values['duration'], values['bytes_written'])
+
+    def read(self, path: str, encoding_profiles: Dict[str, EncodingProfile]=None):
+        '''adds a timing report, a benchmark results.jsonl, a recorded history or all of them in a folder'''
+        path=str(path)
+        if os.path.isdir(path):
+            for root, folders, files in os.walk(path):
+                for filename in sorted(files):
+                    if filename.endswith('.timing.json') or filename in ('results.jsonl', 'throughput.jsonl'):
+                        self.read(os.path.join(root, filename), encoding_profiles)
+            return
+        if not os.path.isfile(path):
+            return
+        try:
+            with open(path, 'r') as history_file:
+                if path.endswith('.json'):
+                    self.addEvents(json.load(history_file).get('events', []))
+                    return
+                for line in history_file:
+                    try:
+                        entry=json.loads(line)
+                    except ValueError:
+                        continue
+                    if 'scenario' in entry:
+                        self.addBenchmarkResult(entry, encoding_profiles or {})
+                    elif 'stage' in entry:
+                        self.add(entry['stage'], entry['encoder'], entry['pixels'], entry['seconds'], entry.get('bytes_written', 0))
+        except (OSError, ValueError, KeyError) as e:
+            print('Could not read throughput history {}\n{}'.format(path, e))
+
+    def measured(self, stage: str, encode_settings: EncodeSettings=None) ->bool:
+        return (stage, encode_settings.label() if encode_settings else 'copy') in self.samples
+
+    def pixelsPerSecond(self, stage: str, encode_settings: EncodeSettings=None) ->float:
+        '''throughput of a single job of stage, encode_settings None is a stream copy'''
+        samples=self.samples.get((stage, encode_settings.label() if encode_settings else 'copy'))
+        if samples:
+            return self._speed(samples)
+        if encode_settings is None:
+            return DEFAULT_COPY_THROUGHPUT
+        # the defaults only give the ratio between the presets, they are scaled to the settings measured on this machine
+        ratios=[]
+        for (sample_stage, encoder), stage_samples in self.samples.items():
+            preset=next((part for part in encoder.split() if part in DEFAULT_THROUGHPUT), None)
+            if sample_stage==stage and preset and not encoder.endswith(' chunked'):
+                ratios.append(self._speed(stage_samples)/DEFAULT_THROUGHPUT[preset])
+        calibration=sorted(ratios)[len(ratios)//2] if ratios else 1
+        return DEFAULT_THROUGHPUT.get(encode_settings.preset, DEFAULT_THROUGHPUT['medium'])*calibration
+
+    @staticmethod
+    def _speed(samples) ->float:
+        return sum(sample[0] for sample in samples)/sum(sample[1] for sample in samples)
+
+    def bytesPerPixel(self, stage: str, encode_settings: EncodeSettings) ->float:
+        samples=[sample for sample in self.samples.get((stage, encode_settings.label()), ()) if sample[2]]
+        if samples:
+            return sum(sample[2] for sample in samples)/sum(sample[0] for sample in samples)
+        return defaultBytesPerPixel(encode_settings)
+
+    def estimate(self, stage: str, encode_settings: EncodeSettings, pixels: int) ->tuple:
+        '''expected seconds and bytes written to encode pixels in one job, encode_settings None is a stream copy without size estimate'''
+        seconds=pixels/self.pixelsPerSecond(stage, encode_settings)
+        return seconds, round(pixels*self.bytesPerPixel(stage, encode_settings)) if encode_settings else 0
+
+def recordThroughput(path: str, events: List[BuildEvent]):
+    '''appends the throughput of events to the history at path, one line per stage and encoder'''
+    totals={}
+    for event in events:
+        if event.success and event.encoder and event.pixels>0:
+            total=totals.setdefault((event.stage, event.encoder), [0, 0.0, 0])
+            total[0]+=event.pixels
+            total[1]+=event.duration
+            total[2]+=event.bytes_written
+    if not totals:
+        return
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'a') as history_file:
+            history_file.write(''.join(json.dumps({
+                'stage': stage,
+                'encoder': encoder,
+                'pixels': pixels,
+                'seconds': seconds,
+                'bytes_written': bytes_written,
+                'time': time.time()
+            })+'\n' for (stage, encoder), (pixels, seconds, bytes_written) in totals.items()))
+    except OSError as e:
+        print('Could not write throughput history {}\n{}'.format(path, e))
+
+@dataclass
+class ShotPlan:
+    '''what a build does with one clip of the edit.
+    action is encode, copy (stream copy), reuse (from the clip cache), missing (missing media placeholder) or slate.'''
+    clip: Clip= field(repr=False)
+    name: str
+    action: str
+    frames: int
+    size: tuple
+    profile: str #encoding profile of the converted clip
+    seconds: float=0 #expected conversion time
+    bytes: int=0 #expected size of the converted clip, the real size for reused clips
+
+@dataclass
+class BuildPlan:
+    '''the expected work of a build, see Edit.plan'''
+    name: str
+    profile: str #encoding profile of the build
+    size: tuple
+    jobs: int
+    burn_timecode: bool
+    shots: List[ShotPlan]
+    build_seconds: float=0
+    build_bytes: int=0
+    measured: bool=False #if the estimates come from earlier builds, otherwise from rough defaults
+    deadline: float=None #unix time the build has to be done by
+
+    @property
+    def convert_seconds(self) ->float:
+        # jobs convert in parallel, a single long clip can't be split between them
+        seconds=[shot.seconds for shot in self.shots]
+        return max(sum(seconds)/max(self.jobs, 1), max(seconds, default=0))
+
+    @property
+    def seconds(self) ->float:
+        return self.convert_seconds+self.build_seconds
+
+    @property
+    def frames(self) ->int:
+        return sum(shot.frames for shot in self.shots)
+
+    @property
+    def bytes(self) ->int:
+        '''disk space the build needs for new converted clips and the output'''
+        return sum(shot.bytes for shot in self.shots if shot.action!='reuse')+self.build_bytes
+
+    def fits(self, start: float=None) ->bool:
+        '''if the build started at start (defaults to now) is done by the deadline'''
+        if self.deadline is None:
+            return True
+        return (start or time.time())+self.seconds<=self.deadline
+
+    def counts(self) ->Dict[str, tuple]:
+        '''number of shots and frames per action'''
+        counts={}
+        for shot in self.shots:
+            shots, frames=counts.get(shot.action, (0, 0))
+            counts[shot.action]=(shots+1, frames+shot.frames)
+        return counts
+
+    def summary(self, shots: bool=True) ->str:
+        def duration(seconds):
+            return '{:.1f}s'.format(seconds) if seconds<60 else str(datetime.timedelta(seconds=round(seconds)))
+        lines=['Plan for {}: profile {} at {}x{}, {} jobs, estimated from {}'.format(
+            self.name, self.profile, self.size[0], self.size[1], self.jobs, 'earlier builds' if self.measured else 'rough defaults for settings that were not measured yet')]
+        for action, (count, frames) in self.counts().items():
+            lines.append('    {:<8} {:>6} shots {:>9} frames'.format(action, count, frames))
+        lines.append('Convert {}, {} {}, total {} for {} frames, {:.2f} GB on disk'.format(
+            duration(self.convert_seconds), 'join' if self.burn_timecode else 'build', duration(self.build_seconds), duration(self.seconds), self.frames, self.bytes/1024**3))
+        if self.deadline is not None:
+            lines.append('Deadline {}: {}'.format(datetime.datetime.fromtimestamp(self.deadline).strftime('%Y-%m-%d %H:%M'), 'done in time' if self.fits() else 'too late'))
+        if shots:
+            lines.extend('    {:<24} {:<8} {:<10} {:>7} frames {:>9} {:>9.1f} MB'.format(
+                shot.name, shot.action, shot.profile, shot.frames, duration(shot.seconds), shot.bytes/1024**2) for shot in self.shots)
+        return '\n'.join(lines)
+
+def exactValue(value: Any) ->Fraction:
+    '''frame numbers, rates and durations as exact fractions, float rates like 29.97002997 become 30000/1001'''
+    if isinstance(value, float):
+        return _exactFloat(value)
+    return Fraction(value)
+
+@functools.lru_cache(maxsize=4096)
+def _exactFloat(value: float) ->Fraction:
+    # edits use few distinct rates and durations, limit_denominator is slow
+    return Fraction(value).limit_denominator(1000000)
+
+def frameValue(value: Fraction) ->Any:
+    # whole frames stay integers, everything else becomes a float again for ffmpeg and the json files
+    return int(value) if value.denominator==1 else float(value)
+
+def inFrame(clip: Clip) ->Any:
+    return clip.in_frame
+
+class Timeline(list):
+    '''the clips of an edit, ordered by in_frame.
+    add() inserts with bisect on a list of the in_frames, which is kept up to date on every insert like the frames of all clips and the first in_frame,
+    so building an edit clip by clip stays linear. All frame sums are exact fractions, so long edits don't drift.
+    Call invalidate() after changing durations, frame rates or in_frames of clips in place, they are counted again when needed.'''
+    def __init__(self, clips=()):
+        super().__init__(clips)
+        self.invalidate()
+
+    def invalidate(self):
+        self._sequence_frames=None
+        self._first_frame=None
+        self._in_frames=None
+
+    @staticmethod
+    def clipFrames(clip: Clip) ->Fraction:
+        # the length of a clip in frames of its own rate
+        return exactValue(clip.resolveDuration())*exactValue(clip.fps)
+
+    @property
+    def sequence_frames(self) ->Fraction:
+        '''the sum of the lengths of all clips in frames, where a sequentially added clip starts'''
+        if self._sequence_frames is None:
+            self._sequence_frames=sum((self.clipFrames(clip) for clip in self), Fraction(0))
+        return self._sequence_frames
+
+    @property
+    def first_frame(self) ->Any:
+        if self._first_frame is None:
+            self._first_frame=min((clip.in_frame for clip in self), default=0)
+        return self._first_frame
+
+    def add(self, clip: Clip) ->int:
+        '''inserts clip after all clips with the same or an earlier in_frame and returns its index'''
+        if not self or self[-1].in_frame<=clip.in_frame:
+            index=len(self)
+        else:
+            if self._in_frames is None:
+                self._in_frames=[clip.in_frame for clip in self]
+            index=bisect.bisect_right(self._in_frames, clip.in_frame)
+        self.insert(index, clip)
+        return index
+
+    def append(self, clip: Clip):
+        super().append(clip)
+        if self._in_frames is not None:
+            self._in_frames.append(clip.in_frame)
+        self._added(clip)
+
+    def insert(self, index: int, clip: Clip):
+        super().insert(index, clip)
+        if self._in_frames is not None:
+            self._in_frames.insert(index, clip.in_frame)
+        self._added(clip)
+
+    def _added(self, clip: Clip):
+        if self._sequence_frames is not None:
+            self._sequence_frames+=self.clipFrames(clip)
+        if len(self)==1:
+            self._first_frame=clip.in_frame
+        elif self._first_frame is not None:
+            self._first_frame=min(self._first_frame, clip.in_frame)
+
+    # everything else changing the list recounts it
+    def extend(self, clips):
+        super().extend(clips)
+        self.invalidate()
+
+    def remove(self, clip: Clip):
+        super().remove(clip)
+        self.invalidate()
+
+    def pop(self, index: int=-1) ->Clip:
+        clip=super().pop(index)
+        self.invalidate()
+        return clip
+
+    def clear(self):
+        super().clear()
+        self.invalidate()
+
+    def sort(self, *args, **kwargs):
+        super().sort(*args, **kwargs)
+        self.invalidate()
+
+    def reverse(self):
+        super().reverse()
+        self.invalidate()
+
+    def __setitem__(self, index, value):
+        super().__setitem__(index, value)
+        self.invalidate()
+
+    def __delitem__(self, index):
+        super().__delitem__(index)
+        self.invalidate()
+
+    def __iadd__(self, clips):
+        self.extend(clips)
+        return self
+
 @dataclass
 class Edit:
     config: Config
@@ -603,34 +2541,136 @@ class Edit:
     source_folder: Union(str, Location)=''
     frameoffset: int= 0
     fps: int=None
-    edit: list[Clip]= field(init=False)
+    hooks: list= field(default_factory=list, repr=False) #callables getting every BuildEvent
+    music_path: str='' #audio file laid under the whole edit
+    music_volume: float=1.0
+    edit: Timeline= field(init=False)
     temp_folder: str= field(init=False)
     ready: bool= field(init=False)
+    failed_clips: list[Clip]= field(init=False)
+    timecode_burned: bool= field(init=False)
+    cancel_event: threading.Event= field(init=False, repr=False)
+    events: list[BuildEvent]= field(init=False, repr=False)
+    _events_lock: threading.Lock= field(init=False, repr=False)
 
     def __post_init__(self):
+        self.events=[]
+        self._events_lock=threading.Lock()
+        self.ready=False
         if not self.name:
             self.name=self.config.name
         if self.shot_desc_path:
             self.edit=self.loadEdit(self.shot_desc_path)
             self.findFootage(self.source_folder, latest=True)
         else:
-            self.edit=[]
+            self.edit=Timeline()
         if self.fps==None:
             self.fps=self.config.fps
-        self.temp_folder=None,
+        self.temp_folder=None
+        self.failed_clips=[]
+        self.timecode_burned=False
+        self.cancel_event=threading.Event()
         self.check_ready()
 
     def check_ready(self):
-        if len(self.edit)>0 and all([clip.ready for clip in self.edit]) and all([clip.is_converted for clip in self.edit]): 
+        # unconverted clips are not probed just to check them
+        if len(self.edit)>0 and all(clip.is_converted and clip.ready for clip in self.edit): 
             self.ready=True
         else:
             self.ready=False
 
+    def addHook(self, hook):
+        '''hook is called with every BuildEvent of this edit, possibly from the preconvert threads'''
+        self.hooks.append(hook)
+
+    def emit(self, stage: str, name: str, start: float, duration: float=None, **kwargs) ->BuildEvent:
+        '''records a BuildEvent that started at start and calls the hooks with it, duration defaults to the time since start'''
+        if duration is None:
+            duration=time.time()-start
+        event=BuildEvent(stage=stage, name=name, start=start, duration=duration, **kwargs)
+        with self._events_lock:
+            self.events.append(event)
+        for hook in self.hooks:
+            try:
+                hook(event)
+            except Exception as e:
+                print('Error in build hook {}\n{}'.format(hook, e))
+        return event
+
+    def recordThroughput(self, events: List[BuildEvent]):
+        '''keeps the measured encoding speed of events in the history of the cache folder, see plan()'''
+        if self.config.throughput_history:
+            recordThroughput(self.config.getThroughputHistoryPath(), events)
+
+    def outputSize(self) ->tuple:
+        '''the size of the built edit'''
+        for clip in self.edit:
+            if type(clip)!=Slate:
+                return clip.outputSize()
+        return tuple(self.config.clip_size)
+
+    def timingReport(self) ->Dict:
+        '''sums up the events of this edit per stage'''
+        stages={}
+        for event in self.events:
+            stage=stages.setdefault(event.stage, {'count': 0, 'duration': 0.0, 'frames': 0, 'bytes_written': 0, 'cache_hits': 0, 'cache_misses': 0, 'failed': 0})
+            stage['count']+=1
+            stage['duration']+=event.duration
+            stage['frames']+=event.frames
+            stage['bytes_written']+=event.bytes_written
+            stage['cache_hits']+=event.cache_hits
+            stage['cache_misses']+=event.cache_misses
+            stage['failed']+=0 if event.success else 1
+        return {
+            'edit': self.name,
+            'time': time.time(),
+            'clips': len(self.edit),
+            'fps': self.fps,
+            'stages': stages,
+            'events': [asdict(event) for event in self.events]
+        }
+
+    def writeReport(self, outputpath: str) ->tuple:
+        '''writes the timing report as json and as prometheus textfile next to outputpath.
+        Returns the paths of both files.'''
+        report=self.timingReport()
+        report_path=Path(outputpath).with_suffix('.timing.json')
+        with open(report_path, 'w') as report_file:
+            json.dump(report, report_file, indent=4)
+
+        edit_label='edit="{}"'.format(escapeLabel(self.name))
+        metrics=[
+            ('duration_seconds', 'duration', 'Time spent in the build stage'),
+            ('events', 'count', 'Number of events of the build stage'),
+            ('frames', 'frames', 'Frames encoded in the build stage'),
+            ('bytes_written', 'bytes_written', 'Bytes written in the build stage'),
+            ('cache_hits', 'cache_hits', 'Cache hits in the build stage'),
+            ('cache_misses', 'cache_misses', 'Cache misses in the build stage'),
+            ('failures', 'failed', 'Failed events of the build stage'),
+        ]
+        lines=[]
+        for metric, key, description in metrics:
+            lines.append('# HELP editbot_stage_{} {}'.format(metric, description))
+            lines.append('# TYPE editbot_stage_{} gauge'.format(metric))
+            for stage, values in report['stages'].items():
+                lines.append('editbot_stage_{}{{{},stage="{}"}} {}'.format(metric, edit_label, escapeLabel(stage), values[key]))
+        lines.append('# HELP editbot_build_timestamp_seconds Time the report was written')
+        lines.append('# TYPE editbot_build_timestamp_seconds gauge')
+        lines.append('editbot_build_timestamp_seconds{{{}}} {}'.format(edit_label, report['time']))
+        lines.append('# HELP editbot_build_clips Number of clips in the edit')
+        lines.append('# TYPE editbot_build_clips gauge')
+        lines.append('editbot_build_clips{{{}}} {}'.format(edit_label, report['clips']))
+
+        # the textfile collector may read at any time, so the file is replaced in one go
+        metrics_path=Path(outputpath).with_suffix('.prom')
+        with open(str(metrics_path)+'.tmp', 'w') as metrics_file:
+            metrics_file.write('\n'.join(lines)+'\n')
+        os.replace(str(metrics_path)+'.tmp', metrics_path)
+        return report_path, metrics_path
+
     def addAutoSlate(self, duration=2):
         source_folder_format = self.source_folder if len(str(self.source_folder))<35 else Path(*Path(str(self.source_folder)).parts[-5:])
         shot_desc_path_format = self.shot_desc_path if len(self.shot_desc_path)<35 else Path(*Path(self.shot_desc_path).parts[-2:])
-        print(f"Building autoslate:\n\t{source_folder_format}\n\t{shot_desc_path_format}")
-
         slate_notes = [
                 "Size: {} x {}".format(self.config.clip_size[0], self.config.clip_size[1]),
                 "FPS: {}".format(self.fps),
@@ -658,36 +2698,51 @@ class Edit:
             self.edit.insert(index, clip)
         else:
             if sequential:
-                clip_offset = sum([c.duration*c.fps for c in self.edit])
-                clip.in_frame = clip_offset
-            self.edit.append(clip)
-            self.frameoffset = min([c.in_frame for c in self.edit])
-            self.edit.sort(key=lambda d: d.in_frame)
-        self.check_ready()
-
-    def loadEdit(self, shot_desc_path: str, resetEdit=True) ->list[Clip]:
+                clip.in_frame = frameValue(self.edit.sequence_frames)
+            self.edit.add(clip)
+            self.frameoffset = self.edit.first_frame
+        # the edit stays ready only if the new clip is, the other clips don't need to be checked again
+        self.ready = (self.ready or len(self.edit)==1) and clip.is_converted and clip.ready
+
+    def loadEdit(self, shot_desc_path: str, resetEdit=True, name_pattern: str='', source_start: str='00:00:00:00') ->Timeline:
+        '''loads the shots of a minimal_edit.json, a json lines file with one shot per line, a CMX3600 edl or an OpenTimelineIO file.
+        Edit lists are read event by event, name_pattern picks the shot name from their clip names, see shotName.
+        source_start is the timecode the footage of an edl starts at.'''
         if resetEdit:
-            self.edit=[]
-        with open(shot_desc_path, 'r') as shot_desc:
-            data = json.load(shot_desc)
-            data.sort(key=lambda d: d['startFrame'])
-            for shot in data:
-                self.addClip(
-                    sequential=False, 
-                    clip=Clip(
-                        config=self.config,
-                        in_frame=shot['startFrame'],
-                        duration=shot['durationSeconds'],
-                        name=shot['name']
-                        )
+            self.edit=Timeline()
+        self.addShots(readEditFile(shot_desc_path, self.fps or self.config.fps, name_pattern=name_pattern, source_start=source_start))
+        return self.edit
+
+    def addShots(self, shots) ->Timeline:
+        '''adds shots like in minimal_edit.json from any iterable, they are inserted by startFrame.
+        sourceIn (seconds) sets where the clip starts in its footage.'''
+        for shot in shots:
+            self.addClip(
+                sequential=False, 
+                clip=Clip(
+                    config=self.config,
+                    in_frame=shot['startFrame'],
+                    duration=shot['durationSeconds'],
+                    name=shot['name'],
+                    source_in=shot.get('sourceIn')
                     )
-                    
-        self.frameoffset=min([clip.in_frame for clip in self.edit])
+                )
+        self.frameoffset=self.edit.first_frame
         return self.edit
     
     def findFootage(self, source_folder: Union(str,Location)=None, latest=True, keepClipLengths=False, location_filter=''):
         if source_folder==None:
             source_folder=self.source_folder
+        start=time.time()
+        # the folders are scanned once for the whole edit, every clip is a lookup in the index
+        if type(source_folder)==Location:
+            source_folder.buildIndex()
+        elif type(source_folder)==str:
+            source_folder=LocationIndex(folder=source_folder, recursive=True)
+        self._assignFootage(source_folder, latest, keepClipLengths, location_filter, start)
+
+    def _assignFootage(self, source_folder: Union(LocationIndex,Location), latest: bool, keepClipLengths: bool, location_filter: str, start: float, probe_time: float=0):
+        # probe_time is the time spent probing since start, it is reported as probe event and not counted as discovery
         for clip in self.edit:
             if type(source_folder)==Location:
                 if location_filter:
@@ -698,10 +2753,250 @@ class Edit:
                     clip.findFootage(source_folder, latest=latest, durationFromClip=keepClipLengths )
             else:
                 clip.findFootage(source_folder, latest=latest, durationFromClip=keepClipLengths)
+        # the footage sets the fps and durations of the clips
+        self.edit.invalidate()
         self.check_ready()
+        # clips are probed when their metadata is first needed, see _resolveClips
+        self.emit('discovery', self.name, start, duration=time.time()-start-probe_time, success=all(clip.hasFootage() for clip in self.edit))
+
+    async def find_footage_async(self, source_folder: Union(str,Location)=None, latest=True, keepClipLengths=False, location_filter='', concurrency: int=8):
+        '''like findFootage, but the folders are scanned on a thread and the footage is probed
+        with up to concurrency ffprobe processes running as asyncio subprocesses.'''
+        if source_folder==None:
+            source_folder=self.source_folder
+        start=time.time()
+        probe=self.config.getMediaProbe()
+        if type(source_folder)==Location:
+            await asyncio.to_thread(source_folder.buildIndex)
+        elif type(source_folder)==str:
+            source_folder=await asyncio.to_thread(LocationIndex, folder=source_folder, recursive=True)
+        clip_filter=self._clipLocationFilter(source_folder, location_filter)
+        found=[clip.locateFootage(source_folder, latest=latest, location_filter=clip_filter) for clip in self.edit]
+        semaphore=asyncio.Semaphore(concurrency)
+        async def probeFootage(path):
+            async with semaphore:
+                await probe.probeAsync(path)
+        probe_start=time.time()
+        hits, misses=probe.hits, probe.misses
+        await asyncio.gather(*[probeFootage(path) for path in {footage[0] for footage in found if footage}])
+        probe_event=self.emit('probe', self.name, probe_start, cache_hits=probe.hits-hits, cache_misses=probe.misses-misses)
+        # everything is indexed and probed now, setting the footage only hits the caches
+        self._assignFootage(source_folder, latest, keepClipLengths, location_filter, start, probe_time=probe_event.duration)
+
+    def _clipLocationFilter(self, source_folder: Union(LocationIndex,Location), location_filter: str) ->str:
+        # the sublocation the clips take their footage from, like in _assignFootage
+        if type(source_folder)==Location and not location_filter and self.config.force_pass:
+            return self.config.default_pass_name
+        return location_filter
+
+    def updateFootage(self, paths: List[str], source_folder: Union(LocationIndex,Location)=None, location_filter='') ->List[Clip]:
+        '''updates the footage index with new, changed or removed files and points the clips to their latest footage.
+        source_folder must be a Location or LocationIndex, so only the files in paths are read again.
+        Returns the clips whose footage changed. With the clip cache, converting the edit again only converts these.'''
+        if source_folder is None:
+            source_folder=self.source_folder
+        assert type(source_folder) in (Location, LocationIndex), "Footage can only be updated in a Location or LocationIndex, not {}".format(type(source_folder))
+        paths={os.path.abspath(str(path)) for path in paths}
+        for path in paths:
+            source_folder.updateFile(path)
 
-    def preconvertClips(self, tempfolder: str='') ->str:
-        if any(not c.ready for c in self.edit):
+        clip_filter=self._clipLocationFilter(source_folder, location_filter)
+        changed=[]
+        for clip in self.edit:
+            found=clip.locateFootage(source_folder, location_filter=clip_filter)
+            current_path=os.path.abspath(str(clip.clip_path)) if clip.hasFootage() else None
+            found_path=os.path.abspath(str(found[0])) if found else None
+            if found_path==current_path and found_path not in paths:
+                continue
+            if found_path is None:
+                if type(clip)==Slate:
+                    continue
+                print('Footage for {} was removed'.format(clip.name))
+                clip.resetFootage()
+            else:
+                print('New footage for {}: {}'.format(clip.name, found_path))
+                clip.converted_clip_path=Path()
+                clip.findFootage(source_folder, location_filter=clip_filter)
+            changed.append(clip)
+        if changed:
+            self.edit.invalidate()
+        self.check_ready()
+        return changed
+
+    def preconvertClips(self, tempfolder: str='', jobs: int=None, use_cache: bool=None, burn_timecode: bool=None, profile: Any=None) ->str:
+        '''converts all clips, slates and missing media placeholders of the edit into the tempfolder.
+        jobs sets the number of clips converted in parallel and defaults to config.preconvert_jobs, 0 uses all cpus.
+        With use_cache (defaults to config.clip_cache) unchanged clips are taken from the persistent clip cache
+        and new conversions are stored there instead of the tempfolder.
+        With burn_timecode (defaults to config.burn_timecode) every clip gets the edit timecode at its position in the edit,
+        build() then joins the clips without re-encoding.
+        profile is the name of an encoding profile of the config (defaults to config.encoding_profile).
+        Clips that fail to convert are reported and collected in self.failed_clips, the order of the edit is kept.'''
+        if jobs is None:
+            jobs=self.config.preconvert_jobs
+        if not jobs or jobs<1:
+            jobs=os.cpu_count() or 1
+        tempfolder, cache, settings, output_paths=self._preparePreconvert(tempfolder, use_cache, burn_timecode, profile)
+        # probing the footage while preparing is reported as probe event
+        start=time.time()
+        chunk_jobs=self._chunkJobs(jobs)
+
+        caches=[cache]*len(self.edit)
+        if jobs==1:
+            results=[self._convertEditClip(clip, output_path, cache, encode_settings, chunk_jobs) for clip, output_path, encode_settings in zip(self.edit, output_paths, settings)]
+        else:
+            with ThreadPoolExecutor(max_workers=jobs) as pool:
+                results=list(pool.map(self._convertEditClip, self.edit, output_paths, caches, settings, [chunk_jobs]*len(self.edit)))
+        return self._finishPreconvert(tempfolder, cache, results, start)
+
+    async def preconvert_async(self, tempfolder: str='', concurrency: int=None, use_cache: bool=None, burn_timecode: bool=None, profile: Any=None, on_progress=None) ->str:
+        '''like preconvertClips, but runs up to concurrency (defaults to config.preconvert_jobs, 0 uses all cpus) ffmpeg processes
+        as asyncio subprocesses, so the event loop stays free for other edits.
+        on_progress is called with a FFmpegProgress for every clip that is converted.
+        Cancelling the awaiting task kills the running ffmpeg processes and removes their partial output.'''
+        if concurrency is None:
+            concurrency=self.config.preconvert_jobs
+        if not concurrency or concurrency<1:
+            concurrency=os.cpu_count() or 1
+        tempfolder, cache, settings, output_paths=await asyncio.to_thread(self._preparePreconvert, tempfolder, use_cache, burn_timecode, profile)
+        start=time.time()
+
+        semaphore=asyncio.Semaphore(concurrency)
+        chunk_jobs=self._chunkJobs(concurrency)
+        results=await asyncio.gather(*[
+            self._convertEditClipAsync(clip, output_path, cache, encode_settings, semaphore, on_progress, chunk_jobs)
+            for clip, output_path, encode_settings in zip(self.edit, output_paths, settings)
+            ])
+        return await asyncio.to_thread(self._finishPreconvert, tempfolder, cache, results, start)
+
+    def distributeClips(self, queue_folder: str, use_cache: bool=None, burn_timecode: bool=None, profile: Any=None, work: bool=True, poll: float=1.0, timeout: float=None) ->str:
+        '''like preconvertClips, but the conversions are written as jobs into a WorkQueue in queue_folder,
+        where any number of editbot_worker.py processes on other hosts pick them up.
+        With work the coordinator converts clips as well. Footage, logos and queue_folder must be reachable under the same paths on all hosts.
+        Waits until every clip is converted or failed, or until timeout, and returns the folder with the converted clips.'''
+        queue=WorkQueue(queue_folder)
+        run_id='py_autoedit_{}'.format(uuid.uuid4().hex[:12])
+        tempfolder, cache, settings, output_paths=self._preparePreconvert(os.path.join(queue.folder, 'outputs', run_id), use_cache, burn_timecode, profile)
+        start=time.time()
+
+        results=[None]*len(self.edit)
+        jobs={} #queue job id -> index of the clip and of its chunk
+        clips={} #index of the clip -> [key, clip_start, encode_settings, method, ffmpeg jobs, results of the queue jobs]
+        for i, (clip, output_path, encode_settings) in enumerate(zip(self.edit, output_paths, settings)):
+            clip_start=time.time()
+            key, output_path, cached=self._lookupEditClip(clip, output_path, cache, encode_settings, clip_start)
+            if cached:
+                results[i]=cached
+                continue
+            if key:
+                # converted in the queue and copied into the cache when done
+                cache.discard(output_path)
+                output_path=output_paths[i]
+            # copied, chunked or full like convertClip, the chunks are queued separately and joined here
+            method, ranges=clip.convertMethod(encode_settings=encode_settings)
+            if method=='copy':
+                ffmpeg_jobs=[clip.makeCopyJob(output_path)]
+            elif method=='chunked':
+                ffmpeg_jobs=clip.makeChunkJobs(output_path, ranges, encode_settings=encode_settings)
+            else:
+                ffmpeg_job=clip.makeConvertJob(output_path, encode_settings=encode_settings)
+                ffmpeg_jobs=[ffmpeg_job] if ffmpeg_job is not None else None
+            if ffmpeg_jobs is None:
+                results[i]=self._storeEditClip(clip, key, cache, output_path, False, clip_start, encode_settings)
+                continue
+            mask_path=clip.shotmask.overlay_path
+            for j, ffmpeg_job in enumerate(ffmpeg_jobs):
+                args=[queue.shareFile(arg) if arg==mask_path else arg for arg in ffmpeg_job.args]
+                job=QueueJob(
+                    id='{}_{:04d}'.format(run_id, i) if method!='chunked' else '{}_{:04d}_{:03d}'.format(run_id, i, j),
+                    args=args,
+                    output_path=ffmpeg_job.output_path,
+                    name=ffmpeg_job.name,
+                    frames=ffmpeg_job.frames,
+                    timeout=ffmpeg_job.timeout,
+                    clip={
+                        'name': clip.name,
+                        'source': str(clip.clip_path) if clip.ready else '',
+                        'trim': [clip.frame_handles_in, clip.duration, clip.source_in],
+                        'shotmask': asdict(clip.shotmask) if type(clip)!=Slate else {}
+                    }
+                )
+                queue.submit(job)
+                jobs[job.id]=(i, j)
+            clips[i]=[key, clip_start, encode_settings, method, ffmpeg_jobs, [None]*len(ffmpeg_jobs)]
+        print('Queued {} of {} clips in {}'.format(len(clips), len(self.edit), queue.folder))
+
+        stop_event=threading.Event()
+        worker=None
+        if work and jobs:
+            worker=threading.Thread(target=queue.work, args=(self.config.ffmpeg_bin, '{}-{}-coordinator'.format(platform.node(), os.getpid())), kwargs={'poll': poll, 'stop_event': stop_event}, daemon=True)
+            worker.start()
+        try:
+            while jobs:
+                if self.cancel_event.is_set() or (timeout is not None and time.time()-start>timeout):
+                    print('Stopped waiting for {} queued clips'.format(len(jobs)))
+                    break
+                queue.requeueStale()
+                for job_id in list(jobs):
+                    state=queue.status(job_id)
+                    if state not in ('done', 'failed'):
+                        continue
+                    i, j=jobs.pop(job_id)
+                    key, clip_start, encode_settings, method, ffmpeg_jobs, job_results=clips[i]
+                    job=queue.read(state, job_id)
+                    job_results[j]=FFmpegResult(**job.result) if job and job.result else False
+                    if any(result is None for result in job_results):
+                        continue
+                    del clips[i]
+                    converted=self._finishQueuedClip(self.edit[i], output_paths[i], method, ffmpeg_jobs, job_results, clip_start)
+                    results[i]=self._storeEditClip(self.edit[i], key, cache, output_paths[i], converted, clip_start, encode_settings)
+                if jobs:
+                    time.sleep(poll)
+        finally:
+            stop_event.set()
+            if worker:
+                worker.join()
+        for job_id in jobs:
+            try:
+                os.remove(queue.path('pending', job_id))
+            except OSError:
+                pass
+        for i, (key, clip_start, encode_settings, method, ffmpeg_jobs, job_results) in clips.items():
+            if method=='chunked':
+                self.edit[i].removeChunks(output_paths[i], ffmpeg_jobs)
+            results[i]=self._storeEditClip(self.edit[i], key, cache, output_paths[i], False, clip_start, encode_settings)
+        return self._finishPreconvert(tempfolder, cache, results, start)
+
+    def _finishQueuedClip(self, clip: Clip, output_path: str, method: str, ffmpeg_jobs: List[FFmpegJob], job_results: List[Any], clip_start: float) ->bool:
+        # job_results holds the FFmpegResult of every queue job of the clip, or False for jobs that left no result
+        if method!='chunked':
+            return clip.finishConvert(job_results[0], method) if job_results[0] else False
+        try:
+            if not all(job_results):
+                return False
+            if not all(result.success for result in job_results):
+                return clip.finishChunks(job_results, None, 0)
+            joined=runFFmpeg(self.config.ffmpeg_bin, clip.makeJoinJob(output_path, ffmpeg_jobs), cancel_event=self.cancel_event)
+            return clip.finishChunks(job_results, joined, time.time()-clip_start)
+        finally:
+            clip.removeChunks(output_path, ffmpeg_jobs)
+
+    def _resolveClips(self) ->List[bool]:
+        # clips are probed on first use, all of them are resolved in parallel and reported as one probe event
+        start=time.time()
+        probe=self.config.getMediaProbe()
+        hits, misses=probe.hits, probe.misses
+        with ThreadPoolExecutor(max_workers=os.cpu_count() or 1) as pool:
+            ready=list(pool.map(lambda clip: clip.ready, self.edit))
+        # clips resolved before don't look up the probe again
+        if probe.hits!=hits or probe.misses!=misses:
+            self.emit('probe', self.name, start, cache_hits=probe.hits-hits, cache_misses=probe.misses-misses)
+        return ready
+
+    def _preparePreconvert(self, tempfolder: str, use_cache: bool, burn_timecode: bool, profile: Any) ->tuple:
+        # returns the tempfolder, the clip cache and the encode settings and output path of every clip
+        ready=self._resolveClips()
+        if not all(ready):
             print('Not all clips are ready, output will have missing media clips')
             # return None
         if not tempfolder:
@@ -709,10 +3004,135 @@ class Edit:
         else:
             if not os.path.exists(tempfolder):
                 os.makedirs(tempfolder)
-        for clip in self.edit:
-            clip.convertClip(os.path.join(tempfolder, '{}.mp4'.format(clip.name)))
+        if use_cache is None:
+            use_cache=self.config.clip_cache
+        cache=self.config.getClipCache() if use_cache else None
+        if burn_timecode is None:
+            burn_timecode=self.config.burn_timecode
+        if burn_timecode:
+            # the clips are joined in edit order, so each clip starts where the previous ones end
+            frame=0
+            for clip in self.edit:
+                clip.setSequenceTimecode(frame, self.fps)
+                frame+=round(clip.duration*self.fps)
+        else:
+            # a previous preconvert may have burned it in, build() draws it again
+            for clip in self.edit:
+                clip.clearSequenceTimecode()
+        self.timecode_burned=bool(burn_timecode)
+        profile=self.config.getEncodingProfile(profile)
+        settings=[self._clipEncodeSettings(profile, burn_timecode, clip.encoding_profile) for clip in self.edit]
+
+        # clips are numbered so clips sharing a name don't write to the same file
+        output_paths=[os.path.join(tempfolder, '{:04d}_{}.mp4'.format(i, clip.name)) for i, clip in enumerate(self.edit)]
+        return tempfolder, cache, settings, output_paths
+
+    def _clipEncodeSettings(self, profile: EncodingProfile, burn_timecode: bool, clip_profile: str='') ->EncodeSettings:
+        # clips joined without re-encoding end up in the output as they are, so they all use the final settings
+        if burn_timecode:
+            return profile.final
+        if clip_profile:
+            return self.config.getEncodingProfile(clip_profile).intermediate
+        return profile.intermediate
+
+    def _finishPreconvert(self, tempfolder: str, cache: ClipCache, results: List[tuple], start: float) ->str:
+        events=[event for result, key, event in results]
+        self.emit('preconvert', self.name, start,
+            frames=sum(event.frames for event in events),
+            bytes_written=sum(event.bytes_written for event in events),
+            cache_hits=sum(event.cache_hits for event in events),
+            cache_misses=sum(event.cache_misses for event in events),
+            success=all(event.success for event in events))
+        self.failed_clips=[clip for clip, (result, key, event) in zip(self.edit, results) if not result]
+        if self.failed_clips:
+            print('{} of {} clips failed to convert:'.format(len(self.failed_clips), len(self.edit)))
+            [print('    {}'.format(clip.name)) for clip in self.failed_clips]
+        if cache:
+            cache.evict(keep=[key for result, key, event in results])
+        self.recordThroughput(events)
         self.temp_folder = tempfolder
+        self.check_ready()
         return tempfolder
+
+    def _chunkJobs(self, jobs: int) ->int:
+        # jobs is the budget of ffmpeg processes for the whole edit, each clip converted in parallel gets an equal share for its chunks
+        share=max(1, jobs//max(1, min(jobs, len(self.edit))))
+        return min(self.config.chunk_jobs, share) if self.config.chunk_jobs else share
+
+    def _convertEditClip(self, clip: Clip, output_path: str, cache: ClipCache=None, encode_settings: EncodeSettings=None, chunk_jobs: int=None) ->tuple:
+        # runs in the preconvert pool, a failing clip must not stop the other conversions
+        start=time.time()
+        key, output_path, cached=self._lookupEditClip(clip, output_path, cache, encode_settings, start)
+        if cached:
+            return cached
+        try:
+            result=clip.convertClip(output_path, encode_settings=encode_settings, cancel_event=self.cancel_event, chunk_jobs=chunk_jobs)
+        except Exception as e:
+            print('Error when converting clip {}\n{}'.format(clip.name, e))
+            result=False
+        return self._storeEditClip(clip, key, cache, output_path, result, start, encode_settings)
+
+    async def _convertEditClipAsync(self, clip: Clip, output_path: str, cache: ClipCache, encode_settings: EncodeSettings, semaphore: asyncio.Semaphore, on_progress=None, chunk_jobs: int=None) ->tuple:
+        async with semaphore:
+            start=time.time()
+            # hashing the clip and committing it to the cache may copy whole files, they run on a thread
+            key, output_path, cached=await asyncio.to_thread(self._lookupEditClip, clip, output_path, cache, encode_settings, start)
+            if cached:
+                return cached
+            try:
+                result=await clip.convertClipAsync(output_path, encode_settings=encode_settings, on_progress=on_progress, cancel_event=self.cancel_event, chunk_jobs=chunk_jobs)
+            except asyncio.CancelledError:
+                if os.path.isfile(output_path):
+                    os.remove(output_path)
+                raise
+            except Exception as e:
+                print('Error when converting clip {}\n{}'.format(clip.name, e))
+                result=False
+            return await asyncio.to_thread(self._storeEditClip, clip, key, cache, output_path, result, start, encode_settings)
+
+    def _lookupEditClip(self, clip: Clip, output_path: str, cache: ClipCache, encode_settings: EncodeSettings, start: float) ->tuple:
+        # returns the cache key, the path to convert to and the finished result if the clip was cached
+        key=clip.cacheKey(encode_settings=encode_settings) if cache else None
+        if key:
+            cached_path=cache.lookup(key)
+            if cached_path:
+                clip.converted_clip_path=Path(cached_path)
+                clip.check_converted()
+                event=self.emit('convert', clip.name, start, cache_hits=1, success=clip.is_converted)
+                return key, cached_path, (clip.is_converted, key, event)
+            output_path=cache.partialPath(key)
+        clip.convert_result=None
+        return key, output_path, None
+
+    def _storeEditClip(self, clip: Clip, key: str, cache: ClipCache, output_path: str, result: bool, start: float, encode_settings: EncodeSettings=None) ->tuple:
+        result=bool(result) and clip.is_converted
+        if key:
+            if result:
+                cached_path=cache.commit(key, output_path)
+                clip.converted_clip_path=Path(cached_path) if cached_path else Path()
+                clip.check_converted()
+                result=clip.is_converted
+            else:
+                cache.discard(output_path)
+        convert_result=clip.convert_result
+        frames=convert_result.frames if convert_result else 0
+        if result and not frames:
+            # stream copies report no progress frames
+            frames=round(clip.duration*float(clip.resolveOutFps()))
+        if not encode_settings:
+            encode_settings=self.config.getEncodingProfile().intermediate
+        # history is kept per conversion path, copies and parallel chunks would make a single encoder job look faster than it is
+        method=convert_result.method if convert_result else 'full'
+        encoder='copy' if method=='copy' else encode_settings.label()+(' chunked' if method=='chunked' else '')
+        width, height=clip.outputSize()
+        event=self.emit('convert', clip.name, start,
+            frames=frames,
+            bytes_written=convert_result.bytes_written if convert_result else 0,
+            cache_misses=1 if key else 0,
+            success=result,
+            encoder=encoder,
+            pixels=frames*width*height)
+        return result, key, event
     
     def conformEdit(self, mode='in_frame'):
         '''conforms the clip durations and inframes to be continous. Order will always be determined by in_frame
@@ -721,31 +3141,167 @@ class Edit:
         'in_frame_clip' will use the clips fps to cut at that frame in the clip - if the clip is using different framerates than the edit, values don't match.
         'duration' adjusts the in_frame and out_frame of all clips so the durations stay the same.'''
 
-        self.edit.sort(key=lambda d: d.in_frame)
-        self.frameoffset = min([c.in_frame for c in self.edit])
+        self.edit.sort(key=inFrame)
+        if not self.edit:
+            return
+        self.frameoffset = self.edit[0].in_frame
 
+        # frames are added up as exact fractions, so the cuts don't drift in long edits
+        rate=exactValue(self.fps)
         if mode=='in_frame':
-            for i, clip in enumerate(self.edit):
-                if i<len(self.edit)-1:
-                    nextclip=self.edit[i+1]
-                    clip_framelen=nextclip.in_frame-clip.in_frame
-                    clip.duration=clip_framelen/self.fps
+            for clip, nextclip in zip(self.edit, self.edit[1:]):
+                clip.duration=float((exactValue(nextclip.in_frame)-exactValue(clip.in_frame))/rate)
         elif mode=='in_frame_clip':
-            for i, clip in enumerate(self.edit):
-                if i<len(self.edit)-1:
-                    nextclip=self.edit[i+1]
-                    clip_framelen=nextclip.in_frame-clip.in_frame
-                    clip.duration=clip_framelen/clip.fps
+            for clip, nextclip in zip(self.edit, self.edit[1:]):
+                clip.duration=float((exactValue(nextclip.in_frame)-exactValue(clip.in_frame))/exactValue(clip.fps))
         elif mode=='duration':
-            for i, clip in enumerate(self.edit):
-                if i>0:
-                    prevclip=self.edit[i-1]
-                    clip.in_frame=prevclip.in_frame+prevclip.duration*self.fps
+            frame=exactValue(self.edit[0].in_frame)
+            for prevclip, clip in zip(self.edit, self.edit[1:]):
+                frame+=exactValue(prevclip.resolveDuration())*rate
+                clip.in_frame=frameValue(frame)
         else:
             print('Unknown conform mode, choose "in_frame" or "duration" to conform the edit')
+        self.edit.invalidate()
+
+    def plan(self, history: Any=None, profile: Any=None, jobs: int=None, use_cache: bool=None, burn_timecode: bool=None, deadline: Any=None) ->BuildPlan:
+        '''plans the build of the conformed edit without converting anything: which clips are encoded, copied, reused from the clip cache
+        or replaced by missing media, with the expected frames, disk space and duration. Arguments are the same as for preconvertClips.
+        The estimates come from the measured throughput of each encoding profile in history, a ThroughputHistory or paths of timing reports,
+        benchmark results or folders with them. By default the history every build records in the cache folder is used.
+        With a deadline (a datetime or unix time) faster encoding profiles are chosen for the longest clips, then for the build,
+        and the size of the edit is lowered until it is done in time. applyPlan() sets the choices on the clips.'''
+        if history is None:
+            history=ThroughputHistory()
+            history.read(self.config.getThroughputHistoryPath())
+        elif not isinstance(history, ThroughputHistory):
+            paths=[history] if isinstance(history, (str, Path)) else history
+            history=ThroughputHistory()
+            for path in paths:
+                history.read(path, self.config.encoding_profiles)
+        if jobs is None:
+            jobs=self.config.preconvert_jobs
+        if not jobs or jobs<1:
+            jobs=os.cpu_count() or 1
+        if use_cache is None:
+            use_cache=self.config.clip_cache
+        cache=self.config.getClipCache() if use_cache else None
+        if burn_timecode is None:
+            burn_timecode=self.config.burn_timecode
+        if isinstance(deadline, datetime.datetime):
+            deadline=deadline.timestamp()
+        self._resolveClips()
+
+        profile=self.config.getEncodingProfile(profile)
+        shot_profiles=[clip.encoding_profile for clip in self.edit]
+        plan=self._makePlan(history, profile, shot_profiles, self.outputSize(), jobs, cache, burn_timecode)
+        plan.deadline=deadline
+        if deadline is None or plan.fits():
+            return plan
+
+        # the profiles from the current one to the fastest
+        def faster(stage, part):
+            def speed(p):
+                return history.pixelsPerSecond(stage, getattr(p, part))
+            return sorted([p for p in self.config.encoding_profiles.values() if speed(p)>speed(profile)], key=speed)
+
+        if not burn_timecode:
+            # the converted clips are encoded again by the build, so they lose the least. The longest clips go first
+            order=sorted(range(len(plan.shots)), key=lambda i: plan.shots[i].seconds, reverse=True)
+            total=sum(shot.seconds for shot in plan.shots)
+            for faster_profile in faster('convert', 'intermediate'):
+                for i in order:
+                    shot=plan.shots[i]
+                    if shot.action not in ('encode', 'missing', 'slate'):
+                        continue
+                    faster_shot=self._planShot(shot.clip, faster_profile.intermediate, faster_profile.name, plan.size, cache, history)
+                    if faster_shot.seconds>=shot.seconds:
+                        continue
+                    shot_profiles[i]=faster_profile.name
+                    plan.shots[i]=faster_shot
+                    total+=faster_shot.seconds-shot.seconds
+                    # the sum is checked first, the full check looks for the longest clip as well
+                    if time.time()+total/jobs+plan.build_seconds<=deadline and plan.fits():
+                        return plan
+            # the clips keep their profiles while the build gets faster
+            shot_profiles=[shot.profile for shot in plan.shots]
+        for faster_profile in faster('convert' if burn_timecode else 'build', 'final'):
+            plan=self._makePlan(history, faster_profile, shot_profiles, plan.size, jobs, cache, burn_timecode)
+            plan.deadline=deadline
+            if plan.fits():
+                return plan
+        width, height=plan.size
+        for scale in (0.75, 0.5, 0.25):
+            # even sizes, most encoders need them
+            size=(round(width*scale/2)*2, round(height*scale/2)*2)
+            plan=self._makePlan(history, self.config.getEncodingProfile(plan.profile), shot_profiles, size, jobs, cache, burn_timecode)
+            plan.deadline=deadline
+            if plan.fits():
+                return plan
+        print('{} can not be built by the deadline, the fastest plan takes {:.0f}s'.format(self.name, plan.seconds))
+        return plan
+
+    def _makePlan(self, history: ThroughputHistory, profile: EncodingProfile, shot_profiles: List[str], size: tuple, jobs: int, cache: ClipCache, burn_timecode: bool) ->BuildPlan:
+        shots=[]
+        for clip, shot_profile in zip(self.edit, shot_profiles):
+            encode_settings=self._clipEncodeSettings(profile, burn_timecode, shot_profile)
+            shots.append(self._planShot(clip, encode_settings, shot_profile if shot_profile and not burn_timecode else profile.name, size, cache, history))
+        pixels=round(sum(clip.duration for clip in self.edit)*self.fps)*size[0]*size[1]
+        if burn_timecode:
+            # the converted clips are joined as they are
+            build_seconds=history.estimate('concat', None, pixels)[0]
+            build_bytes=sum(shot.bytes for shot in shots)
+        else:
+            build_seconds, build_bytes=history.estimate('build', profile.final, pixels)
+        measured=all(history.measured('convert', self._clipEncodeSettings(profile, burn_timecode, shot.profile)) for shot in shots if shot.action!='reuse')
+        return BuildPlan(
+            name=self.name,
+            profile=profile.name,
+            size=tuple(size),
+            jobs=jobs,
+            burn_timecode=burn_timecode,
+            shots=shots,
+            build_seconds=build_seconds,
+            build_bytes=build_bytes,
+            measured=measured and (burn_timecode or history.measured('build', profile.final))
+        )
+
+    def _planShot(self, clip: Clip, encode_settings: EncodeSettings, profile_name: str, size: tuple, cache: ClipCache, history: ThroughputHistory) ->ShotPlan:
+        # clips at another size than they were created with are never in the cache and always encoded
+        resized=tuple(size)!=clip.outputSize()
+        out_fps=float(clip.resolveOutFps())
+        shot=ShotPlan(clip=clip, name=clip.name, action='encode', frames=round(clip.duration*out_fps), size=tuple(size), profile=profile_name)
+        pixels_per_frame=size[0]*size[1]
+        key=clip.cacheKey(encode_settings=encode_settings) if cache and not resized else None
+        if key and cache.contains(key):
+            shot.action='reuse'
+            shot.bytes=os.path.getsize(cache.path(key))
+            return shot
+        if type(clip)==Slate:
+            shot.action='slate'
+        elif not clip.ready:
+            shot.action='missing'
+        else:
+            if not resized and clip.copyRanges(encode_settings=encode_settings):
+                shot.action='copy'
+                info=clip.getMediaInfo()
+                shot.seconds=history.estimate('convert', None, shot.frames*pixels_per_frame)[0]
+                shot.bytes=round(info.size*clip.duration/info.duration) if info and info.duration else 0
+                return shot
+        shot.seconds, shot.bytes=history.estimate('convert', encode_settings, shot.frames*pixels_per_frame)
+        return shot
+
+    def applyPlan(self, plan: BuildPlan):
+        '''sets the encoding profile and size of every clip chosen by plan, then build with preconvertClips(profile=plan.profile)
+        and build(outputpath, profile=plan.profile)'''
+        for shot in plan.shots:
+            shot.clip.encoding_profile='' if shot.profile==plan.profile else shot.profile
+            shot.clip.setOutputSize(plan.size)
 
     def cleanup(self, check_folder_name:bool=True):
-        if Path(self.temp_folder).exists(): 
+        '''removes the temp folder of this edit, clips in the persistent clip cache are kept'''
+        start=time.time()
+        cache_folder=os.path.abspath(os.path.join(self.config.cache_folder, 'clips'))
+        if self.temp_folder and Path(self.temp_folder).exists() and not os.path.abspath(self.temp_folder).startswith(cache_folder): 
             if (check_folder_name and 'py_autoedit_' in self.temp_folder) or not check_folder_name:
                 print('Removing Temp Folder at {}'.format(self.temp_folder))
                 shutil.rmtree(self.temp_folder)
@@ -754,6 +3310,7 @@ class Edit:
             clip.check_converted()
             # clip.check_ready()
         self.check_ready()
+        self.emit('cleanup', self.name, start)
 
     def makeEditConcatFile(self):
         if not self.temp_folder:
@@ -763,7 +3320,7 @@ class Edit:
             editdata=''
             for clip in self.edit:
                 if clip.is_converted:
-                    editdata+=("file '{}'\n".format(clip.converted_clip_path))
+                    editdata+=("file '{}'\n".format(str(clip.converted_clip_path).replace("'", "'\\''")))
                 else:
                     print("Skipping unconverted clip for {}. Make sure to preconvert all clips before building".format(clip.name))
             editfile.write(editdata)
@@ -772,66 +3329,321 @@ class Edit:
     def fastbuild(self, outputpath:str, ffmpeg_bin:str=''):
         '''run ffmpeg demuxer for this filestack without reencoding. 
         This is very fast but it won't add sequencedata or a shotmask.
-        outputpath must be a full filename and needs to be handled by the user'''
-        
-        editfile=self.makeEditConcatFile()
+        outputpath must be a full filename and needs to be handled by the user.
+        Returns None if ffmpeg failed.'''
         if not ffmpeg_bin:
             ffmpeg_bin=self.config.ffmpeg_bin
-        ffmpeg_cmd = (
-            "{ffmpeg_bin} -y -hide_banner -stats -loglevel error "
-            "-f concat -safe 0 "
-            "-i {input} "
-            "-c copy "
-            "{output_name}"
-        ).format(
-            ffmpeg_bin=ffmpeg_bin, 
-            input=editfile, 
-            output_name=outputpath
-            )
-        
-        subprocess.call(ffmpeg_cmd)
-        return Path(outputpath)
+        return self._runBuildJob(ffmpeg_bin, self._makeFastbuildJob(outputpath), 'concat')
+
+    def build(self, outputpath:str, ffmpeg_bin:str='', profile: Any=None):
+        '''Builds the full edit. This will add a timecode and re-encode everything with the final settings of the encoding profile.
+        This is quite slow. For a faster build, use the fastbuild() function.
+        If the timecode was burned into the clips by preconvertClips, the clips are joined without re-encoding.
+        Returns None if ffmpeg failed.'''
 
-    def build(self, outputpath:str, ffmpeg_bin:str=''):
-        '''Builds the full edit. This will add a timecode and re-encode everything.
-        This is quite slow. For a faster build, use the fastbuild() function'''
+        if self.timecode_burned:
+            print('Timecode is burned into the clips, joining them without re-encoding')
+            return self.fastbuild(outputpath, ffmpeg_bin=ffmpeg_bin)
 
         if not ffmpeg_bin:
             ffmpeg_bin=self.config.ffmpeg_bin
-        
+        return self._runBuildJob(ffmpeg_bin, self._makeBuildJob(outputpath, profile), 'build', self.config.getEncodingProfile(profile).final)
+
+    async def build_async(self, outputpath:str, ffmpeg_bin:str='', profile: Any=None, on_progress=None):
+        '''like build, but ffmpeg runs as asyncio subprocess. on_progress is called with a FFmpegProgress while it encodes.
+        Cancelling the awaiting task kills ffmpeg.'''
+        if not ffmpeg_bin:
+            ffmpeg_bin=self.config.ffmpeg_bin
+        if self.timecode_burned:
+            print('Timecode is burned into the clips, joining them without re-encoding')
+            job, stage, encode_settings=await asyncio.to_thread(self._makeFastbuildJob, outputpath), 'concat', None
+        else:
+            job, stage, encode_settings=self._makeBuildJob(outputpath, profile), 'build', self.config.getEncodingProfile(profile).final
+        start=time.time()
+        result=await runFFmpegAsync(ffmpeg_bin, job, on_progress=on_progress, cancel_event=self.cancel_event)
+        return await asyncio.to_thread(self._finishBuildJob, job, result, stage, start, encode_settings)
+
+    def _makeFastbuildJob(self, outputpath:str) ->FFmpegJob:
+        editfile=self.makeEditConcatFile()
+        return FFmpegJob(
+            args=['-y', '-hide_banner', '-loglevel', 'error',
+                '-f', 'concat', '-safe', '0',
+                '-i', str(editfile),
+                '-c', 'copy',
+                str(outputpath)],
+            output_path=str(outputpath),
+            name='{} fastbuild'.format(self.name),
+            timeout=self.config.ffmpeg_timeout,
+            frames=round(sum(c.duration for c in self.edit if c.is_converted)*self.fps)
+        )
+
+    def _makeBuildJob(self, outputpath:str, profile: Any=None) ->FFmpegJob:
         sequencemask=ShotMask(
             mode='sequence',
             fps=self.fps,
             date=datetime.date.today().isoformat()
         )
 
-        inputlist=''
+        inputlist=[]
         concatfilterlist=''
 
-        for i, clip in enumerate(self.edit):
+        for clip in self.edit:
             if clip.is_converted:
-                inputlist+= '-i "{}" '.format(clip.converted_clip_path)
-                concatfilterlist+='[{index}:0] '.format(index=i)
+                concatfilterlist+='[{index}:0] '.format(index=len(inputlist)//2)
+                inputlist.extend(['-i', str(clip.converted_clip_path)])
             else:
                 print('Skipping unconverted clip for {}. Make sure to preconvert all clips before building'.format(clip.name))
 
-        concatfilter='{concatfilterlist}concat=n={clipnum}:v=1:a=0'.format(concatfilterlist=concatfilterlist, clipnum=len([c for c in self.edit if c.is_converted]))
-        ffmpeg_cmd = (
-            "{ffmpeg_bin} -y -hide_banner -stats -loglevel error "
-            "{input} "
-            "-filter_complex \"{concatfilter}[0];[0]{sequencemaskfilter}\" "
-            #"-movflags faststart "
-            "{output_name}"
-        ).format(
-            ffmpeg_bin=ffmpeg_bin, 
-            input=inputlist, 
-            concatfilter=concatfilter,
-            sequencemaskfilter=sequencemask.generateFilterString(),
-            output_name=outputpath
+        concatfilter='{concatfilterlist}concat=n={clipnum}:v=1:a=0'.format(concatfilterlist=concatfilterlist, clipnum=len(inputlist)//2)
+        return FFmpegJob(
+            args=['-y', '-hide_banner', '-loglevel', 'error']
+                +inputlist
+                +['-filter_complex', '{concatfilter}[0];[0]{sequencemaskfilter}'.format(concatfilter=concatfilter, sequencemaskfilter=sequencemask.generateFilterString())]
+                #+['-movflags', 'faststart']
+                +self.config.getEncodingProfile(profile).final.args()
+                +[str(outputpath)],
+            output_path=str(outputpath),
+            name='{} build'.format(self.name),
+            timeout=self.config.ffmpeg_timeout,
+            frames=round(sum(c.duration for c in self.edit if c.is_converted)*self.fps)
+        )
+
+    def _runBuildJob(self, ffmpeg_bin: str, job: FFmpegJob, stage: str, encode_settings: EncodeSettings=None) ->Optional[Path]:
+        start=time.time()
+        result=runFFmpeg(ffmpeg_bin, job, cancel_event=self.cancel_event)
+        return self._finishBuildJob(job, result, stage, start, encode_settings)
+
+    def _finishBuildJob(self, job: FFmpegJob, result: FFmpegResult, stage: str, start: float, encode_settings: EncodeSettings=None) ->Optional[Path]:
+        # encode_settings None joins the clips without re-encoding, stream copies don't always report their frames
+        width, height=self.outputSize()
+        event=self.emit(stage, self.name, start, frames=result.frames, bytes_written=result.bytes_written, success=result.success,
+            encoder=encode_settings.label() if encode_settings else 'copy', pixels=(result.frames or job.frames)*width*height)
+        self.recordThroughput([event])
+        if not reportResult(result):
+            return None
+        if self.config.source_audio or self.music_path:
+            # the graph renders every clip, the other builds only the converted ones
+            clips=list(self.edit) if stage=='graph' else [clip for clip in self.edit if clip.is_converted]
+            if not self.addAudio(job.output_path, clips=clips):
+                print('Could not add audio, the edit has no sound')
+        if self.config.build_report:
+            self.writeReport(job.output_path)
+        return Path(job.output_path)
+
+    def addAudio(self, videopath: str, source_audio: bool=None, music_path: str=None, music_volume: float=None, clips: List[Clip]=None, ffmpeg_bin: str='') ->Optional[Path]:
+        '''renders the audio of the edit in a separate pass and muxes it into the video at videopath without re-encoding the video.
+        Existing audio of the video is replaced, so the music can be swapped on a finished build.
+        source_audio (defaults to config.source_audio) takes the audio of every clip, music_path (defaults to self.music_path)
+        is mixed under the whole edit with music_volume. clips defaults to the converted clips, like build() uses them.
+        Returns None if ffmpeg failed.'''
+        if not ffmpeg_bin:
+            ffmpeg_bin=self.config.ffmpeg_bin
+        if clips is None:
+            clips=[clip for clip in self.edit if clip.is_converted]
+        start=time.time()
+        base_path=os.path.splitext(str(videopath))[0]
+        audio_path='{}.{}.audio.m4a'.format(base_path, uuid.uuid4().hex[:8])
+        partial_path='{}.{}.partial{}'.format(base_path, uuid.uuid4().hex[:8], os.path.splitext(str(videopath))[1])
+        try:
+            result=self.renderAudio(audio_path, source_audio, music_path, music_volume, clips, ffmpeg_bin)
+            if not result:
+                return None
+            job=FFmpegJob(
+                args=['-y', '-hide_banner', '-loglevel', 'error',
+                    '-i', str(videopath), '-i', audio_path,
+                    '-map', '0:v:0', '-map', '1:a:0', '-c', 'copy',
+                    partial_path],
+                output_path=partial_path,
+                name='{} mux'.format(self.name),
+                timeout=self.config.ffmpeg_timeout
             )
-        
-        subprocess.call(ffmpeg_cmd)
-        return Path(outputpath)
+            muxed=runFFmpeg(ffmpeg_bin, job, cancel_event=self.cancel_event)
+            self.emit('audio', self.name, start, bytes_written=muxed.bytes_written, success=muxed.success)
+            if not reportResult(muxed):
+                return None
+            os.replace(partial_path, str(videopath))
+            return Path(videopath)
+        finally:
+            for path in (audio_path, partial_path):
+                if os.path.isfile(path):
+                    os.remove(path)
+
+    def renderAudio(self, outputpath: str, source_audio: bool=None, music_path: str=None, music_volume: float=None, clips: List[Clip]=None, ffmpeg_bin: str='') ->Optional[Path]:
+        '''renders the audio track of the edit into outputpath, see addAudio.
+        The audio of every clip is cut to the exact length of its frames in parallel, joined and mixed with the music in one encode.'''
+        if not ffmpeg_bin:
+            ffmpeg_bin=self.config.ffmpeg_bin
+        if source_audio is None:
+            source_audio=self.config.source_audio
+        if music_path is None:
+            music_path=self.music_path
+        if music_volume is None:
+            music_volume=self.music_volume
+        if clips is None:
+            clips=[clip for clip in self.edit if clip.is_converted]
+        rate=self.config.audio_rate
+        # every clip gets exactly the samples of its frames, so the audio does not drift against the video
+        samples=[round(round(clip.duration*self.fps)/self.fps*rate) for clip in clips]
+
+        folder=tempfile.mkdtemp(prefix='py_autoedit_audio_')
+        try:
+            if source_audio and clips:
+                segment_paths=[os.path.join(folder, '{:04d}.wav'.format(i)) for i in range(len(clips))]
+                jobs=self.config.preconvert_jobs or os.cpu_count() or 1
+                with ThreadPoolExecutor(max_workers=jobs) as pool:
+                    results=list(pool.map(lambda args: runFFmpeg(ffmpeg_bin, self._makeAudioSegmentJob(*args), cancel_event=self.cancel_event), zip(clips, samples, segment_paths)))
+                failed=[result for result in results if not result.success]
+                if failed:
+                    reportResult(failed[0])
+                    return None
+                list_path=os.path.join(folder, 'audio.txt')
+                with open(list_path, 'w') as list_file:
+                    list_file.write(''.join("file '{}'\n".format(path.replace("'", "'\\''")) for path in segment_paths))
+                inputs=['-f', 'concat', '-safe', '0', '-i', list_path]
+            else:
+                inputs=['-f', 'lavfi', '-i', 'anullsrc=r={}:cl=stereo'.format(rate)]
+            if music_path:
+                inputs.extend(['-i', str(music_path)])
+                filter_string='[1:a]aresample={rate},volume={volume},apad[music];[0:a][music]amix=inputs=2:duration=first:normalize=0,atrim=end_sample={samples}'.format(
+                    rate=rate, volume=music_volume, samples=sum(samples))
+            else:
+                filter_string='[0:a]aresample={},atrim=end_sample={}'.format(rate, sum(samples))
+            job=FFmpegJob(
+                args=['-y', '-hide_banner', '-loglevel', 'error']
+                    +inputs
+                    +['-filter_complex', filter_string, '-ac', '2', '-ar', str(rate),
+                    '-c:a', self.config.audio_codec, '-b:a', self.config.audio_bitrate,
+                    str(outputpath)],
+                output_path=str(outputpath),
+                name='{} audio'.format(self.name),
+                timeout=self.config.ffmpeg_timeout
+            )
+            result=runFFmpeg(ffmpeg_bin, job, cancel_event=self.cancel_event)
+            if not reportResult(result):
+                return None
+            return Path(outputpath)
+        finally:
+            shutil.rmtree(folder, ignore_errors=True)
+
+    def _makeAudioSegmentJob(self, clip: Clip, samples: int, output_path: str) ->FFmpegJob:
+        # the audio of a clip as pcm, silence for clips without audio
+        rate=self.config.audio_rate
+        info=clip.getMediaInfo() if type(clip)!=Slate and clip.ready else None
+        if info and info.has_audio:
+            inputs=['-ss', str(clip.sourceStart()), '-t', str(samples/rate+1), '-i', str(clip.clip_path)]
+        else:
+            inputs=['-f', 'lavfi', '-i', 'anullsrc=r={}:cl=stereo'.format(rate)]
+        return FFmpegJob(
+            args=['-y', '-hide_banner', '-loglevel', 'error']
+                +inputs
+                +['-vn', '-af', 'aresample={},apad,atrim=end_sample={}'.format(rate, samples),
+                '-ac', '2', '-c:a', 'pcm_s16le', output_path],
+            output_path=output_path,
+            name='{} audio'.format(clip.name),
+            timeout=self.config.ffmpeg_timeout
+        )
+
+    def cancel(self):
+        '''stops all running and queued ffmpeg jobs of this edit'''
+        self.cancel_event.set()
+
+    def renderGraph(self, outputpath:str, ffmpeg_bin:str='', tempfolder:str='', profile: Any=None):
+        '''Renders the whole edit with a single ffmpeg filter graph, without writing intermediate clips.
+        Every clip is trimmed and masked inside the graph, slates and missing media are generated from lavfi sources.
+        This is fastest for short edits. If the graph gets too large or fails to render,
+        the clips are converted one by one with preconvertClips() and joined with build().'''
+        if not ffmpeg_bin:
+            ffmpeg_bin=self.config.ffmpeg_bin
+
+        if self.config.chunk_length and any(len(clip.chunkRanges())>1 for clip in self.edit):
+            # a single graph runs in one process, long clips are converted in parallel chunks with the timecode burned in
+            # and joined without re-encoding instead
+            print('Edit has clips longer than the chunk length, converting them in chunks')
+            self.preconvertClips(tempfolder, profile=profile, burn_timecode=True)
+            return self.build(outputpath, ffmpeg_bin=ffmpeg_bin, profile=profile)
+
+        # the graph draws the edit timecode once for the whole edit
+        for clip in self.edit:
+            clip.clearSequenceTimecode()
+        self.timecode_burned=False
+        job=self._makeGraphJob(outputpath, self.config.getEncodingProfile(profile).final)
+        if job is None:
+            print('Edit is too large for a single graph, converting clips one by one')
+        else:
+            result=self._runBuildJob(ffmpeg_bin, job, 'graph', self.config.getEncodingProfile(profile).final)
+            if result or self.cancel_event.is_set():
+                return result
+            print('Rendering the edit graph failed, converting clips one by one')
+        self.preconvertClips(tempfolder, profile=profile)
+        return self.build(outputpath, ffmpeg_bin=ffmpeg_bin, profile=profile)
+
+    def _makeGraphJob(self, outputpath:str, encode_settings: EncodeSettings) ->Optional[FFmpegJob]:
+        # returns None if the graph gets too large
+        if not self.edit or len(self.edit)>self.config.graph_max_clips:
+            return None
+
+        inputlist=[]
+        def addInput(input_args):
+            inputlist.append(input_args)
+            return len(inputlist)-1
+
+        # every logo is a single input, split for all the clips using it
+        logo_uses={}
+        for clip in self.edit:
+            logo_path=self.config.shot_mask_logo_path if type(clip)==Slate else (clip.shotmask.logo_path if clip.shotmask.mode=='clip' else '')
+            if logo_path:
+                logo_uses.setdefault(logo_path, []).append(clip)
+        logo_labels={}
+        logofilters=[]
+        for n, (logo_path, clips) in enumerate(logo_uses.items()):
+            logo_input=addInput(['-i', logo_path])
+            labels=['logo{}_{}'.format(n, i) for i in range(len(clips))]
+            logofilters.append('[{}:v]split={}{}'.format(logo_input, len(labels), ''.join('[{}]'.format(l) for l in labels)))
+            for clip, label in zip(clips, labels):
+                logo_labels[id(clip)]=label
+
+        segments=[]
+        for i, clip in enumerate(self.edit):
+            out_fps=clip.resolveOutFps()
+            logo_label=logo_labels.get(id(clip), '')
+            if type(clip)==Slate:
+                segment=relabelFilter(clip.generateFilterString(), 's{}'.format(i), {'0:v': logo_label})
+            else:
+                shotmask=replace(clip.shotmask, burn_timecode=False, overlay_path='')
+                if clip.ready:
+                    clip_input=addInput(['-ss', str(clip.sourceStart()), '-t', str(clip.duration), '-i', str(clip.clip_path)])
+                    video_in='{}:v'.format(clip_input)
+                    segment=''
+                else:
+                    video_in='m{}'.format(i)
+                    segment='{}[{}];'.format(relabelFilter(clip.generateMissingMediaFilter(), 'm{}'.format(i)), video_in)
+                segment+=relabelFilter(shotmask.generateFilterString(video_in='video_in'), 's{}'.format(i), {'1:v': logo_label, 'video_in': video_in})
+            segments.append('{segment}[s{i}];[s{i}]fps={out_fps},trim=duration={duration},setpts=PTS-STARTPTS,setsar=1,format=yuv420p[v{i}]'.format(
+                segment=segment, i=i, out_fps=out_fps, duration=clip.duration))
+
+        sequencemask=ShotMask(
+            mode='sequence',
+            fps=self.fps,
+            date=datetime.date.today().isoformat()
+        )
+        graph=';'.join(logofilters+segments+[
+            '{}concat=n={}:v=1:a=0[cat]'.format(''.join('[v{}]'.format(i) for i in range(len(self.edit))), len(self.edit)),
+            '[cat]{}'.format(sequencemask.generateFilterString())
+        ])
+        job=FFmpegJob(
+            args=['-y', '-hide_banner', '-loglevel', 'error']
+                +[arg for input_args in inputlist for arg in input_args]
+                +['-filter_complex', graph, '-r', str(self.fps)]
+                +encode_settings.args()
+                +[str(outputpath)],
+            output_path=str(outputpath),
+            name='{} graph'.format(self.name),
+            timeout=self.config.ffmpeg_timeout,
+            frames=round(sum(c.duration for c in self.edit)*self.fps)
+        )
+        if sum(len(arg)+1 for arg in job.args)>self.config.graph_max_length:
+            return None
+        return job
 
 if __name__ == "__main__":
 
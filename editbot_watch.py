@@ -0,0 +1,179 @@
+# keeps an edit up to date while new takes land in the footage folder:
+# python editbot_watch.py -d path/to/editconfig.json -f path/to/footage -p Animation -o path/to/edit.mp4 -fps 30
+
+from editbot_main import *
+import os, time, tempfile, threading, mimetypes, argparse
+
+try:
+    # inotify on linux, the native apis on windows and mac
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except ImportError:
+    Observer = None
+    FileSystemEventHandler = object
+
+ffmpeg_bin=r"C:\Program Files\ffmpeg\bin\ffmpeg.exe"
+ffprobe_bin=r"C:\Program Files\ffmpeg\bin\ffprobe.exe"
+
+def is_video(path):
+    return (mimetypes.guess_type(str(path))[0] or '').startswith('video/')
+
+class ChangeHandler(FileSystemEventHandler):
+    def __init__(self, watcher):
+        self.watcher = watcher
+
+    def on_any_event(self, event):
+        if event.is_directory:
+            return
+        self.watcher.addChanges([event.src_path, getattr(event, 'dest_path', '')])
+
+class EditWatcher:
+    '''watches the folders of the edits footage source and rebuilds the edit shortly after new or changed takes land.
+    Only the changed files are read again and, with the clip cache, only the affected shots are converted.
+    Uses watchdog (inotify on linux) if it is installed and polls the folders otherwise.'''
+    def __init__(self, edit, output_path, tempfolder='', jobs=None, settle=2.0, poll=2.0, use_watchdog=True):
+        self.edit = edit
+        if type(edit.source_folder)==str:
+            # the index is kept and updated with every change
+            edit.source_folder = LocationIndex(folder=edit.source_folder, recursive=True)
+        self.output_path = output_path
+        self.tempfolder = tempfolder or tempfile.mkdtemp(prefix='py_autoedit_')
+        self.jobs = jobs
+        self.settle = settle # seconds without new changes before rebuilding, so files that are still written are not picked up
+        self.poll = poll
+        self.use_watchdog = use_watchdog and Observer is not None
+        self.changes = set()
+        self.last_change = 0
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.rebuild_thread = None
+
+    def watchedIndexes(self):
+        source = self.edit.source_folder
+        if type(source)==Location:
+            return [location.getIndex() for location in source.allLocations()]
+        return [source]
+
+    def addChanges(self, paths):
+        paths = [os.path.abspath(path) for path in paths if path and is_video(path)]
+        if not paths:
+            return
+        with self.lock:
+            self.changes.update(paths)
+            self.last_change = time.time()
+
+    def snapshot(self):
+        files = {}
+        for index in self.watchedIndexes():
+            scan = LocationIndex(folder=index.folder, subfolders_only=index.subfolders_only, recursive=index.recursive)
+            files.update({str(path): (entry.mtime, entry.size) for path, entry in scan.entries.items() if is_video(path)})
+        return files
+
+    def rebuild(self, paths=None):
+        start = time.time()
+        if paths is not None:
+            changed = self.edit.updateFootage(paths)
+            if not changed:
+                return
+            print("Updating {}".format(", ".join(clip.name for clip in changed)))
+        self.edit.preconvertClips(self.tempfolder, jobs=self.jobs, use_cache=True)
+        # the old edit stays in place until the new one is complete
+        partial_path = "{}.partial{}".format(*os.path.splitext(self.output_path))
+        if self.edit.build(partial_path):
+            os.replace(partial_path, self.output_path)
+            print("Edit updated in {:.1f}s: {}".format(time.time()-start, self.output_path))
+        elif os.path.isfile(partial_path):
+            os.remove(partial_path)
+
+    def startRebuild(self):
+        with self.lock:
+            paths, self.changes = self.changes, set()
+        self.rebuild_thread = threading.Thread(target=self.rebuild, args=(paths,), daemon=True)
+        self.rebuild_thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def run(self):
+        self.rebuild()
+
+        observer = None
+        if self.use_watchdog:
+            observer = Observer()
+            handler = ChangeHandler(self)
+            for index in self.watchedIndexes():
+                observer.schedule(handler, index.folder, recursive=index.recursive or index.subfolders_only)
+            observer.start()
+            print("Watching for new footage")
+        else:
+            files = self.snapshot()
+            print("Watching for new footage every {}s".format(self.poll))
+        last_poll = time.time()
+
+        try:
+            while not self.stop_event.wait(0.5):
+                if observer is None and time.time()-last_poll>=self.poll:
+                    new_files = self.snapshot()
+                    self.addChanges([path for path in set(files)|set(new_files) if files.get(path)!=new_files.get(path)])
+                    files, last_poll = new_files, time.time()
+                with self.lock:
+                    settled = self.changes and time.time()-self.last_change>=self.settle
+                # changes arriving during a rebuild are picked up by the next one
+                if settled and not (self.rebuild_thread and self.rebuild_thread.is_alive()):
+                    self.startRebuild()
+        finally:
+            if observer is not None:
+                observer.stop()
+                observer.join()
+            if self.rebuild_thread:
+                self.rebuild_thread.join()
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(
+                    prog='Editbot Watcher',
+                    description='Builds an edit and rebuilds it whenever new takes land in the footage folder')
+    parser.add_argument("--edit_desc", "-d", type=str, required=True)
+    parser.add_argument("--folder", "-f", type=str, required=True)
+    parser.add_argument("--output", "-o", type=str, required=True)
+    parser.add_argument("--pass_name", "-p", type=str, default="latest pass")
+    parser.add_argument("--frames_per_second", "-fps", type=int, default=24)
+    parser.add_argument("--name", "-n", type=str, default="Edit")
+    parser.add_argument("--subfolders", action="store_true", help="footage is located in subfolders")
+    parser.add_argument("--jobs", "-j", type=int, default=0, help="clips converted in parallel, 0 uses all cpus")
+    parser.add_argument("--settle", type=float, default=2.0, help="seconds without changes before rebuilding")
+    parser.add_argument("--poll", type=float, default=2.0, help="polling interval if watchdog is not installed")
+    parser.add_argument("--no_watchdog", action="store_true", help="always poll the folders")
+    parser.add_argument("--ffmpeg", type=str, default=ffmpeg_bin)
+    parser.add_argument("--ffprobe", type=str, default=ffprobe_bin)
+
+    args = parser.parse_args()
+
+    config = Config(
+        ffmpeg_bin=args.ffmpeg,
+        ffprobe_bin=args.ffprobe,
+        name=args.name,
+        default_pass_name=args.pass_name,
+        enable_shotmask=True,
+        shot_mask_logo_path=os.path.join(os.path.dirname(__file__),"res","ta_logo_new.png"),
+        clip_frame_handles=0,
+        fps=args.frames_per_second,
+        force_pass=True
+    )
+
+    storageLocation = Location(name='root', folder=args.folder)
+    storageLocation.addSublocation(Location(name=args.pass_name, folder=args.folder, priority=7, subfolders_only=args.subfolders))
+
+    edit = Edit(
+        config=config,
+        shot_desc_path=args.edit_desc,
+        source_folder=storageLocation
+        )
+    edit.conformEdit(mode='duration')
+    edit.addAutoSlate(duration=5)
+
+    watcher = EditWatcher(edit, args.output, jobs=args.jobs, settle=args.settle, poll=args.poll, use_watchdog=not args.no_watchdog)
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        print("Stopped")
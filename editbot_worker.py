@@ -0,0 +1,30 @@
+# run on every render node with access to the queue folder: python editbot_worker.py -q //server/share/editbot_queue --ffmpeg /usr/bin/ffmpeg
+
+from editbot_main import *
+import os, argparse
+
+ffmpeg_bin=r"C:\Program Files\ffmpeg\bin\ffmpeg.exe"
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(
+                    prog='Editbot Worker',
+                    description='Converts the clips queued by Edit.distributeClips in a shared queue folder')
+    parser.add_argument("--queue", "-q", type=str, required=True)
+    parser.add_argument("--ffmpeg", type=str, default=ffmpeg_bin)
+    parser.add_argument("--name", "-n", type=str, default="", help="worker name shown in the queue, defaults to host and process id")
+    parser.add_argument("--idle_timeout", type=float, default=None, help="stop after the queue was empty for this many seconds")
+    parser.add_argument("--poll", type=float, default=1.0)
+    parser.add_argument("--stale_after", type=float, default=120, help="requeue jobs of nodes without heartbeat after this many seconds")
+    parser.add_argument("--steal_after", type=float, default=300, help="take over jobs running longer than this many seconds when idle")
+
+    args = parser.parse_args()
+
+    queue = WorkQueue(folder=args.queue, stale_after=args.stale_after, steal_after=args.steal_after)
+    print(f"Working on {os.path.abspath(args.queue)}")
+    try:
+        finished = queue.work(args.ffmpeg, worker=args.name, poll=args.poll, idle_timeout=args.idle_timeout)
+        print(f"Converted {finished} clips")
+    except KeyboardInterrupt:
+        # the heartbeat stops, so other workers requeue the running job
+        print("Stopped")
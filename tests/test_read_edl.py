@@ -0,0 +1,24 @@
+import os, sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from editbot_main import readEDL
+
+DISSOLVE_EDL = '''TITLE: DISSOLVE
+FCM: NON-DROP FRAME
+
+001  AX       V     C        00:00:10:00 00:00:15:00 01:00:00:00 01:00:05:00
+* FROM CLIP NAME: S010_v002.mov
+002  AX       V     C        00:00:20:00 00:00:20:00 01:00:05:00 01:00:05:00
+002  AX       V     D    024 00:00:30:00 00:00:33:00 01:00:05:00 01:00:08:00
+* FROM CLIP NAME: S010_v002.mov
+* TO CLIP NAME: S020_v001.mov
+'''
+
+def test_dissolve(tmp_path):
+    path = tmp_path / 'dissolve.edl'
+    path.write_text(DISSOLVE_EDL)
+    shots = list(readEDL(path, 24, name_pattern=r'S\d+', source_start='00:00:00:00'))
+    # the outgoing half of the dissolve has no record duration and is no shot of its own
+    assert [shot['name'] for shot in shots] == ['S010', 'S020']
+    assert [shot['startFrame'] for shot in shots] == [86400, 86400+5*24]
+    assert [shot['durationSeconds'] for shot in shots] == [5, 3]
+    assert [shot['sourceIn'] for shot in shots] == [10, 30]